@@ -0,0 +1,169 @@
+"""
+小红书爆款文案批量生成（无界面）
+读取 CSV/JSONL 中的 (theme, style, length, category) 行，按并发上限调用与页面相同的生成链，
+结果逐行追加写入 JSONL；输出文件同时作为断点记录，重跑时自动跳过已成功的行。
+
+用法：
+    python batch_generate.py themes.csv -o results.jsonl -c 8
+    MOONSHOT_API_KEY=sk-xxx python batch_generate.py themes.jsonl -o results.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from core.xhs_copy import MODEL_NAME, TEMPERATURE, generate_xiaohongshu_content
+from core.response_cache import make_cache_key
+from core.metrics import start_metrics_export
+
+# 缺省参数与页面默认选项保持一致
+DEFAULT_ROW = {"style": "种草", "length": "中（200字）", "category": "美妆"}
+FIELDS = ("theme", "style", "length", "category")
+
+
+def read_rows(path):
+    """读取 CSV（需表头）或 JSONL 输入，返回 [(行号, 参数字典)]"""
+    rows = []
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        for row_no, record in enumerate(records, 1):
+            if not isinstance(record, dict):
+                print(f"⚠️ 第{row_no}行不是 JSON 对象，已跳过", file=sys.stderr)
+                continue
+            # JSONL 的值可能是数字等非字符串（如 "length": 300），统一转成文本
+            row = {key: str(record.get(key) or DEFAULT_ROW.get(key, "")).strip() for key in FIELDS}
+            if not row["theme"]:
+                print(f"⚠️ 第{row_no}行缺少 theme，已跳过", file=sys.stderr)
+                continue
+            rows.append((row_no, row))
+    return rows
+
+
+def row_id(row_no, row):
+    """行标识 = 行号 + 参数摘要；输入文件被改动后，改过的行会重新生成"""
+    return f"{row_no}:{make_cache_key(MODEL_NAME, TEMPERATURE, **row)[:16]}"
+
+
+def load_checkpoint(output_path):
+    """从已有输出中收集成功完成的行标识"""
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 崩溃时可能留下半行，忽略
+            if record.get("status") == "ok":
+                finished.add(record["id"])
+    return finished
+
+
+def generate_row(api_key, row_no, row):
+    start = time.perf_counter()
+    content, error = generate_xiaohongshu_content(
+        api_key, row["theme"], row["style"], row["length"], row["category"],
+        coalesce=False  # 输入里重复的行通常就是想要多个版本
+    )
+    return {
+        "id": row_id(row_no, row),
+        "row": row_no,
+        **row,
+        "status": "ok" if content else "error",
+        "content": content,
+        "error": error.strip() if error else None,
+        "latency": round(time.perf_counter() - start, 3),
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def run_batch(api_key, rows, output_path, concurrency=4, max_consecutive_errors=5):
+    """并发生成并逐条落盘；连续失败达到上限（如额度耗尽）时停止派发新任务"""
+    finished = load_checkpoint(output_path)
+    todo = [(row_no, row) for row_no, row in rows if row_id(row_no, row) not in finished]
+    summary = {"total": len(rows), "skipped": len(rows) - len(todo), "ok": 0, "error": 0, "latencies": []}
+    print(f"共 {len(rows)} 行，已完成 {summary['skipped']} 行，待生成 {len(todo)} 行（并发 {concurrency}）")
+
+    consecutive_errors = 0
+    queue = iter(todo)
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        running = set()
+
+        def fill():
+            while len(running) < concurrency and consecutive_errors < max_consecutive_errors:
+                item = next(queue, None)
+                if item is None:
+                    return
+                running.add(executor.submit(generate_row, api_key, *item))
+
+        fill()
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+                summary[record["status"]] += 1
+                summary["latencies"].append(record["latency"])
+                consecutive_errors = 0 if record["status"] == "ok" else consecutive_errors + 1
+                print(f"[{record['status']}] 第{record['row']}行 {record['theme']} {record['latency']:.2f}s")
+            fill()
+    summary["elapsed"] = time.perf_counter() - start
+    summary["stopped"] = consecutive_errors >= max_consecutive_errors
+    return summary
+
+
+def print_report(summary):
+    latencies = sorted(summary["latencies"])
+    done = summary["ok"] + summary["error"]
+    rate = done / summary["elapsed"] * 60 if summary["elapsed"] else 0.0
+    print("\n====== 批量生成报告 ======")
+    print(f"成功 {summary['ok']} 行 ｜ 失败 {summary['error']} 行 ｜ 断点跳过 {summary['skipped']} 行 ｜ 共 {summary['total']} 行")
+    print(f"耗时 {summary['elapsed']:.1f}s ｜ 吞吐 {rate:.1f} 行/分钟")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"单行延迟：平均 {statistics.mean(latencies):.2f}s ｜ P50 {statistics.median(latencies):.2f}s ｜ "
+              f"P95 {p95:.2f}s ｜ 最大 {latencies[-1]:.2f}s")
+    if summary["stopped"]:
+        print("⚠️ 连续失败次数达到上限，已提前停止（可能是额度耗尽或密钥失效），修复后重跑即可从断点继续")
+
+
+def main(argv=None):
+    load_dotenv()
+    start_metrics_export("batch_generate")  # 长批次运行期间也能在 metrics_admin.py 中看到进度
+    parser = argparse.ArgumentParser(description="小红书爆款文案批量生成")
+    parser.add_argument("input", help="输入文件（CSV 需含 theme/style/length/category 表头，或 JSONL）")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="结果 JSONL（兼作断点文件）")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="同时在途的请求数")
+    parser.add_argument("--api-key", default=os.getenv("MOONSHOT_API_KEY", ""), help="默认读取环境变量 MOONSHOT_API_KEY")
+    parser.add_argument("--max-consecutive-errors", type=int, default=5, help="连续失败多少行后停止派发")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("缺少 API Key：请通过 --api-key 或环境变量 MOONSHOT_API_KEY 提供")
+    summary = run_batch(
+        args.api_key,
+        read_rows(args.input),
+        args.output,
+        concurrency=max(1, args.concurrency),
+        max_consecutive_errors=args.max_consecutive_errors
+    )
+    print_report(summary)
+    return 1 if summary["stopped"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""性能基准工具（冷启动、端到端压测等），在仓库根目录以 python -m bench.xxx 运行"""
@@ -0,0 +1,256 @@
+"""
+端到端压测：用本地模拟服务（或 --base-url 指定的兼容服务）驱动各页面的生成路径，
+统计 p50/p95/p99 延迟、吞吐、失败与兜底次数，结果写入 JSON，可用 --baseline 与旧版本对比。
+默认关闭客户端限流（MOONSHOT_RPM/TPM 置 0），延迟只反映应用本身；加 --rate-limit 时保留限流，
+排队耗时（queue_wait）单独统计，不混进调用延迟的对比。
+
+场景：
+    xhs_copy / xhs_copy_stream   xiaohong.py 的 generate_xiaohongshu_content / 流式生成
+    xhs_title / xhs_content / xhs_tags / xhs_note   xiaohongshu.py 的三个生成函数及并发组合
+    scholar_api / scholar_pipeline   ScholarMind 的 call_moonshot_api 及选题→综述→摘要完整流程
+
+用法：
+    python -m bench.e2e_bench --requests 50 --concurrency 8 --output .cache/e2e.json
+    python -m bench.e2e_bench --scenarios xhs_copy scholar_api --error-rate 0.05 --baseline .cache/e2e.json
+    MOONSHOT_RPM=60 python -m bench.e2e_bench --rate-limit --scenarios scholar_api
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+
+from bench.mock_moonshot import add_config_arguments, config_from_args, start_mock_server
+
+BENCH_API_KEY = "sk-bench"
+
+
+def percentile(sorted_values, pct):
+    """最近秩法百分位（输入需已排序）"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def build_scenarios(api_key):
+    """返回 {场景名: 单次操作函数}；操作函数返回 {"ok", "fallback", "ttft"}"""
+    # 必须在设置 MOONSHOT_BASE_URL 之后再导入 core
+    from core.dag import run_stage_dag
+    from core.chains import get_validated_llm
+    from core.moonshot import call_moonshot_api
+    from core.scholar import build_scholar_stages, get_literature
+    from core.xhs_copy import generate_xiaohongshu_content, stream_xiaohongshu_content
+    from core.xhs_note import (
+        generate_xhs_content,
+        generate_xhs_note_concurrently,
+        generate_xhs_tags,
+        generate_xhs_title
+    )
+
+    llm = get_validated_llm(api_key)
+    literature = get_literature("计算机科学/机器学习/大模型幻觉抑制")
+
+    def with_warnings(func):
+        def run(i):
+            warnings = []
+            func(i, warnings.append)
+            return {"ok": True, "fallback": bool(warnings), "ttft": None}
+        return run
+
+    def xhs_copy(i):
+        content, _ = generate_xiaohongshu_content(api_key, f"压测主题{i}", "种草", "中（200字）", "美妆")
+        return {"ok": content is not None, "fallback": False, "ttft": None}
+
+    def xhs_copy_stream(i):
+        stats = {}
+        for _ in stream_xiaohongshu_content(api_key, f"压测主题{i}", "种草", "中（200字）", "美妆", stats):
+            pass
+        return {"ok": stats["content"] is not None, "fallback": False, "ttft": stats["first_token_time"]}
+
+    def xhs_note(i):
+        fallback = False
+        for _, _, warnings in generate_xhs_note_concurrently(llm, "好物分享", f"压测主题{i}", "元气少女"):
+            fallback = fallback or bool(warnings)
+        return {"ok": True, "fallback": fallback, "ttft": None}
+
+    def scholar_api(i):
+        result = call_moonshot_api(api_key, f"压测提示词{i}：生成3个学术选题", max_tokens=500)
+        return {"ok": result is not None, "fallback": result is None, "ttft": None}
+
+    def scholar_pipeline(i):
+        stages = build_scholar_stages(api_key, "计算机科学/机器学习", f"压测问题{i}", literature,
+                                      ["创新选题建议", "文献综述框架", "论文摘要初稿"])
+        fallback = False
+        for _, _, warnings in run_stage_dag(stages):
+            fallback = fallback or bool(warnings)
+        return {"ok": True, "fallback": fallback, "ttft": None}
+
+    return {
+        "xhs_copy": xhs_copy,
+        "xhs_copy_stream": xhs_copy_stream,
+        "xhs_title": with_warnings(lambda i, warn: generate_xhs_title(llm, "好物分享", f"主题{i}", "元气少女", warn=warn)),
+        "xhs_content": with_warnings(lambda i, warn: generate_xhs_content(llm, "好物分享", f"主题{i}", "元气少女", warn=warn)),
+        "xhs_tags": with_warnings(lambda i, warn: generate_xhs_tags(llm, "好物分享", f"主题{i}", warn=warn)),
+        "xhs_note": xhs_note,
+        "scholar_api": scholar_api,
+        "scholar_pipeline": scholar_pipeline,
+    }
+
+
+def queue_wait_totals():
+    """限流排队的累计 (次数, 秒数)；只有排队超过 10ms 的请求会被记录"""
+    from core.metrics import metrics
+    histogram = metrics.snapshot()["latency"].get("queue_wait", {})
+    return histogram.get("count", 0), histogram.get("sum", 0.0)
+
+
+def run_scenario(name, operation, requests, concurrency):
+    """以固定并发执行 requests 次操作，返回延迟分布、吞吐与排队统计"""
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            outcome = operation(i)
+        except Exception as e:
+            outcome = {"ok": False, "fallback": False, "ttft": None, "exception": f"{type(e).__name__}: {e}"}
+        outcome["latency"] = time.perf_counter() - start
+        return outcome
+
+    waits_before, waited_before = queue_wait_totals()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    waits_after, waited_after = queue_wait_totals()
+
+    latencies = sorted(o["latency"] * 1000 for o in outcomes)
+    ttfts = sorted(o["ttft"] * 1000 for o in outcomes if o.get("ttft") is not None)
+    exceptions = [o["exception"] for o in outcomes if "exception" in o]
+    summary = {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": sum(o["ok"] for o in outcomes),
+        "failed": sum(not o["ok"] for o in outcomes),
+        "fallbacks": sum(o["fallback"] for o in outcomes),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 1),
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(latencies[-1], 1),
+        },
+        "queue_wait": {
+            "count": waits_after - waits_before,
+            "total_s": round(waited_after - waited_before, 3),
+        },
+        "exceptions": exceptions[:5],
+    }
+    if ttfts:
+        summary["ttft_ms"] = {"p50": round(percentile(ttfts, 50), 1), "p95": round(percentile(ttfts, 95), 1)}
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_summary(results, baseline=None):
+    previous = {r["scenario"]: r for r in (baseline or {}).get("scenarios", [])}
+    print(f"\n{'场景':<18}{'成功':>6}{'失败':>6}{'兜底':>6}{'吞吐/s':>9}{'P50':>9}{'P95':>9}{'P99':>9}  对比基线P95")
+    for r in results:
+        lat = r["latency_ms"]
+        delta = ""
+        if r["scenario"] in previous:
+            old = previous[r["scenario"]]["latency_ms"]["p95"]
+            delta = f"{(lat['p95'] - old) / old:+.1%}" if old else ""
+        print(f"{r['scenario']:<18}{r['ok']:>6}{r['failed']:>6}{r['fallbacks']:>6}{r['throughput_rps']:>9}"
+              f"{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}  {delta}")
+        if "ttft_ms" in r:
+            print(f"{'':<18}首 token：P50 {r['ttft_ms']['p50']}ms ｜ P95 {r['ttft_ms']['p95']}ms")
+        queue = r.get("queue_wait", {})
+        if queue.get("count"):
+            print(f"{'':<18}限流排队：{queue['count']} 次，共 {queue['total_s']}s")
+        for exception in r["exceptions"]:
+            print(f"{'':<18}⚠️ {exception}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="端到端压测（本地模拟月之暗面服务）")
+    parser.add_argument("--scenarios", nargs="+", help="要运行的场景，默认全部")
+    parser.add_argument("--requests", type=int, default=30, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=4, help="每个场景的并发数")
+    parser.add_argument("--base-url", help="使用已有的兼容服务，而不是启动内置模拟服务")
+    parser.add_argument("--api-key", default=BENCH_API_KEY)
+    parser.add_argument("--output", help="结果 JSON 路径")
+    parser.add_argument("--baseline", help="旧版本结果 JSON，用于对比 P95")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="保留客户端限流（按 MOONSHOT_RPM/TPM 或默认配额）；默认关闭，避免排队混进延迟")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server, mock_config = None, None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        mock_config = config_from_args(args)
+        server = start_mock_server(mock_config)
+        base_url = server.base_url
+    os.environ["MOONSHOT_BASE_URL"] = base_url
+    if not args.rate_limit:
+        # 与 MOONSHOT_BASE_URL 一样，须在导入 core 之前设置
+        os.environ["MOONSHOT_RPM"] = os.environ["MOONSHOT_TPM"] = "0"
+    print(f"压测目标：{base_url}")
+
+    try:
+        scenarios = build_scenarios(args.api_key)
+        names = args.scenarios or list(scenarios)
+        unknown = [name for name in names if name not in scenarios]
+        if unknown:
+            parser.error(f"未知场景：{unknown}，可选：{list(scenarios)}")
+        results = []
+        for name in names:
+            print(f"运行场景 {name}（{args.requests} 次，并发 {args.concurrency}）...")
+            results.append(run_scenario(name, scenarios[name], args.requests, args.concurrency))
+    finally:
+        if server:
+            server.shutdown()
+
+    from core.metrics import metrics
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(results, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "git_revision": git_revision(),
+                "python": sys.version.split()[0],
+                "base_url": base_url,
+                "rate_limit": args.rate_limit,
+                "mock_config": asdict(mock_config) if mock_config else None,
+                "server_counters": server.counters if server else None,
+                "metrics": metrics.snapshot(),
+                "scenarios": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
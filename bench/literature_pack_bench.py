@@ -0,0 +1,148 @@
+"""
+文献包基准：把 N 篇合成文献编译成文献包，测量
+- 编译耗时、文件大小（字节/篇），以及同样数据做成 字典 + 元组（CORE_LITERATURE 的结构）时每条的内存占用
+- 冷启动：新进程从 import 到完成第一次检索的耗时
+- 检索延迟（P50/P99）
+- 多个工作进程同时映射同一文献包并检索时，每个进程的私有内存与共享内存（/proc/self/smaps_rollup）
+
+用法：
+    python -m bench.literature_pack_bench
+    python -m bench.literature_pack_bench --entries 3000000 --workers 4 --json .cache/literature_pack_bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.literature_bench import DISCIPLINES, PROBLEMS, TOPICS, percentile, synthetic_papers
+from core.literature_pack import LiteraturePack, build_pack
+
+COLD_START = """
+import sys, time
+start = time.perf_counter()
+from core.literature_pack import LiteraturePack
+pack = LiteraturePack(sys.argv[1])
+pack.search("计算机科学/机器学习", "低资源场景性能下降")
+print(time.perf_counter() - start)
+"""
+DICT_SAMPLE = 100000
+
+
+def random_queries(count, rng):
+    return [(f"{rng.choice(list(DISCIPLINES))}/{rng.choice(TOPICS)[:-1]}", rng.choice(PROBLEMS)) for _ in range(count)]
+
+
+def dict_bytes_per_entry(rng):
+    """同样的数据做成 {领域: [(作者, 《标题》, 期刊)]} 时每条文献的内存占用"""
+    tracemalloc.start()
+    literature = {}
+    for paper in synthetic_papers(DICT_SAMPLE, rng):
+        literature.setdefault(paper["field"], []).append(
+            (f"{paper['authors']}, {paper['year']}", f"《{paper['title']}》", paper["venue"])
+        )
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / DICT_SAMPLE
+
+
+def memory_kb():
+    """当前进程的 Rss / Pss / 私有内存（KB），读不到时返回空字典（非 Linux）"""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            lines = [line.split() for line in f]
+    except OSError:
+        return {}
+    values = {line[0].rstrip(":"): int(line[1]) for line in lines if len(line) == 3}
+    return {"rss": values["Rss"], "pss": values["Pss"],
+            "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)}
+
+
+def worker(path, queries, barrier, results):
+    before = memory_kb()
+    pack = LiteraturePack(path)
+    for field, problem in queries:
+        pack.search(field, problem)
+    barrier.wait()  # 所有进程都映射并检索完之后再采样，Pss 才能反映共享
+    after = memory_kb()
+    results.put({key: after[key] - before.get(key, 0) for key in after})
+    barrier.wait()
+
+
+def measure_workers(path, workers, queries):
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=worker, args=(path, queries, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文献包（内存映射）基准")
+    parser.add_argument("--entries", type=int, default=2000000, help="文献条数")
+    parser.add_argument("--queries", type=int, default=300, help="检索次数")
+    parser.add_argument("--workers", type=int, default=4, help="同时映射文献包的进程数")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "literature.pack")
+        start = time.perf_counter()
+        count = build_pack(synthetic_papers(args.entries, rng), path)
+        build_seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        cold = [float(subprocess.run([sys.executable, "-c", COLD_START, path], cwd=root, check=True,
+                                     capture_output=True, text=True).stdout) for _ in range(3)]
+
+        pack = LiteraturePack(path)
+        latencies = []
+        for field, problem in random_queries(args.queries, rng):
+            start = time.perf_counter()
+            pack.search(field, problem)
+            latencies.append(time.perf_counter() - start)
+
+        samples = measure_workers(path, args.workers, random_queries(50, rng))
+
+    result = {
+        "entries": count,
+        "build_seconds": round(build_seconds, 1),
+        "pack_mb": round(size / 1e6, 1),
+        "pack_bytes_per_entry": round(size / count),
+        "dict_bytes_per_entry": round(dict_bytes_per_entry(rng)),
+        "cold_start_s": round(min(cold), 3),
+        "search_ms_p50": round(percentile(latencies, 0.5) * 1000, 2),
+        "search_ms_p99": round(percentile(latencies, 0.99) * 1000, 2),
+        "search_ms_mean": round(statistics.mean(latencies) * 1000, 2),
+    }
+    if samples and samples[0]:
+        result.update({
+            "workers": args.workers,
+            "worker_rss_mb": round(statistics.mean(s["rss"] for s in samples) / 1024, 1),
+            "worker_pss_mb": round(statistics.mean(s["pss"] for s in samples) / 1024, 1),
+            "worker_private_mb": round(statistics.mean(s["private"] for s in samples) / 1024, 1),
+        })
+    for key, value in result.items():
+        print(f"{key:<24}{value}")
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
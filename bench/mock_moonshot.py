@@ -0,0 +1,275 @@
+"""
+本地 OpenAI 兼容的月之暗面模拟服务，用于压测（不消耗真实额度）
+实现 GET /v1/models、POST /v1/chat/completions（流式 / 非流式），可配置：
+首包延迟、抖动、慢请求长尾、token 生成速率、5xx 错误率、429 限流率（带 Retry-After）
+提示词 + max_tokens 超过所选模型上下文时与线上一样返回 400
+
+独立运行：
+    python -m bench.mock_moonshot --port 8765 --latency-ms 300 --tokens-per-sec 80
+    MOONSHOT_BASE_URL=http://127.0.0.1:8765/v1 streamlit run xiaohong.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INVALID_API_KEY = "sk-invalid"  # 用该密钥请求时返回 401，便于覆盖鉴权失败路径
+MODEL_CONTEXTS = {"moonshot-v1-8k": 8192, "moonshot-v1-32k": 32768, "moonshot-v1-128k": 131072}
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 300.0  # 首包（首 token）前的基础延迟
+    jitter_ms: float = 100.0  # 基础延迟上叠加的均匀抖动
+    slow_rate: float = 0.0  # 慢请求占比（模拟长尾）
+    slow_ms: float = 3000.0  # 慢请求额外延迟
+    tokens_per_sec: float = 200.0  # 生成速率（0 表示瞬间生成）
+    completion_tokens: int = 120  # 每次回复的 token 数上限（同时受请求 max_tokens 约束）
+    error_rate: float = 0.0  # 返回 500 的比例
+    rate_limit_rate: float = 0.0  # 返回 429 的比例
+    retry_after: float = 1.0  # 429 响应的 Retry-After（秒）
+
+
+def build_completion_text(tokens, sectioned=False):
+    """
+    生成符合各解析逻辑的回复：短行（标题≤20字）+ 正文 + 结尾标签行，约 2 字/token
+    sectioned 时按单次请求模式的【标题】【正文】【标签】小节格式输出
+    """
+    if sectioned:
+        body = build_completion_text(max(tokens - 40, 30)).rsplit("\n", 1)[0]
+        tags = " ".join(f"#模拟标签{n}" for n in range(1, 11))
+        return f"【标题】\n✨模拟标题一😀\n✨模拟标题二😀\n✨模拟标题三😀\n【正文】\n{body}\n【标签】\n{tags}"
+    lines, budget = [], tokens * 2
+    i = 1
+    while budget > 0:
+        line = f"✨第{i}行模拟文案内容😀"
+        lines.append(line)
+        budget -= len(line)
+        i += 1
+    lines.append(" ".join(f"#模拟标签{n}" for n in range(1, 6)))
+    return "\n".join(lines)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 2)
+
+
+class MockMoonshotHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，连接池复用才有意义
+    server_version = "MockMoonshot/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer ") or auth == f"Bearer {INVALID_API_KEY}" or auth == "Bearer ":
+            self._send_json(401, {"error": {"message": "Invalid Authentication", "type": "invalid_authentication_error"}})
+            return False
+        return True
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/v1/models":
+            return self._send_json(404, {"error": {"message": "not found"}})
+        if self._authorized():
+            self._send_json(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "owned_by": "moonshot"}
+                for model in ("moonshot-v1-8k", "moonshot-v1-32k", "moonshot-v1-128k")
+            ]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            return self._send_json(404, {"error": {"message": "not found"}})
+        if not self._authorized():
+            return
+        self.server.record("requests")
+
+        context = MODEL_CONTEXTS.get(request.get("model"), MODEL_CONTEXTS["moonshot-v1-8k"])
+        requested = sum(estimate_tokens(m.get("content", "")) for m in request.get("messages", []))
+        requested += int(request.get("max_tokens") or 0)
+        if requested > context:
+            self.server.record("errors")
+            return self._send_json(400, {"error": {
+                "message": f"Invalid request: Your request exceeded model token limit: {context}",
+                "type": "invalid_request_error",
+            }})
+
+        roll = random.random()
+        if roll < self.config.rate_limit_rate:
+            self.server.record("rate_limited")
+            return self._send_json(
+                429,
+                {"error": {"message": "rate limit reached", "type": "rate_limit_reached_error"}},
+                {"Retry-After": f"{self.config.retry_after:g}"}
+            )
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.server.record("errors")
+            return self._send_json(500, {"error": {"message": "mock upstream error", "type": "server_error"}})
+
+        delay = self.config.latency_ms + random.uniform(0, self.config.jitter_ms)
+        if random.random() < self.config.slow_rate:
+            delay += self.config.slow_ms
+        time.sleep(delay / 1000)
+
+        tokens = min(self.config.completion_tokens, int(request.get("max_tokens") or self.config.completion_tokens))
+        n = max(1, int(request.get("n") or 1))
+        sectioned = any("【标题】" in (m.get("content") or "") for m in request.get("messages", []))
+        texts = [build_completion_text(tokens, sectioned) for _ in range(n)]
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in request.get("messages", []))
+        completion_tokens = sum(estimate_tokens(text) for text in texts)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        model = request.get("model", "moonshot-v1-8k")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if request.get("stream"):
+            return self._stream(completion_id, model, texts[0], usage)
+
+        if self.config.tokens_per_sec:
+            time.sleep(completion_tokens / n / self.config.tokens_per_sec)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                for i, text in enumerate(texts)
+            ],
+            "usage": usage,
+        })
+
+    def _stream(self, completion_id, model, text, usage):
+        """SSE 流式返回：每个分片约 1 个 token（2 字），按 tokens_per_sec 节奏输出"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None, extra=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            payload.update(extra or {})
+            return json.dumps(payload, ensure_ascii=False)
+
+        interval = 1 / self.config.tokens_per_sec if self.config.tokens_per_sec else 0
+        write_event(chunk({"role": "assistant", "content": ""}))
+        for start in range(0, len(text), 2):
+            write_event(chunk({"content": text[start:start + 2]}))
+            if interval:
+                time.sleep(interval)
+        write_event(chunk({}, "stop", {"usage": usage}))
+        write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class MockMoonshotServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockMoonshotHandler)
+        self.config = config
+        self.counters = {"requests": 0, "errors": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+
+    def record(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_mock_server(config=None, host="127.0.0.1", port=0):
+    """在后台线程启动模拟服务（port=0 自动分配），返回 server；用完调用 server.shutdown()"""
+    server = MockMoonshotServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    """把 MockConfig 的各项暴露为命令行参数（独立运行和压测脚本共用）"""
+    defaults = MockConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="首包基础延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms, help="延迟抖动上限（毫秒）")
+    parser.add_argument("--slow-rate", type=float, default=defaults.slow_rate, help="慢请求占比")
+    parser.add_argument("--slow-ms", type=float, default=defaults.slow_ms, help="慢请求额外延迟（毫秒）")
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults.tokens_per_sec, help="token 生成速率")
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens, help="每次回复 token 数上限")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="返回 500 的比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="返回 429 的比例")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after, help="429 的 Retry-After（秒）")
+
+
+def config_from_args(args):
+    return MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地月之暗面模拟服务（OpenAI 兼容）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = MockMoonshotServer((args.host, args.port), config_from_args(args))
+    print(f"模拟服务已启动：{server.base_url}（Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"请求统计：{server.counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+相似主题索引基准：合成 N 条主题写入临时索引，测量查询延迟（P50/P99）、近似改写的召回率和误报率
+
+用法：
+    python -m bench.similar_bench
+    python -m bench.similar_bench --entries 100000 --queries 2000 --json .cache/similar_bench.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from core.similar_index import SimilarIndex, jaccard, shingles
+
+PREFIXES = ["夏日", "春季", "秋冬", "周末", "新手", "学生党", "上班族", "宝妈", "平价", "小众", "高级感", "懒人", "一周",
+            "沉浸式", "百元内", "早八", "约会", "出差", "露营", "租房"]
+SUBJECTS = ["防晒", "穿搭", "通勤妆", "早餐", "健身", "护肤", "收纳", "减脂餐", "咖啡", "香水", "发型", "读书",
+            "旅行攻略", "拍照", "手账", "烘焙", "理财", "数码好物", "口红", "面膜", "瑜伽", "装修", "养猫", "摄影"]
+SUFFIXES = ["技巧", "清单", "攻略", "分享", "推荐", "合集", "避坑指南", "心得", "教程", "好物", "日常", "测评"]
+PLACES = ["北京", "上海", "广州", "深圳", "成都", "杭州", "重庆", "西安", "南京", "武汉", "长沙", "厦门", "青岛", "大理",
+          "三亚", "苏州", "天津", "昆明", "哈尔滨", "宿舍", "办公室", "出租屋", "小户型", "海边", "山里", "健身房",
+          "图书馆", "机场", "高铁上", "公司楼下", "家里", "阳台", "厨房", "卧室", "车里", "咖啡馆", "公园", "校园",
+          "商场", "民宿"]
+FILLER_CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+NAMESPACE = "bench|种草|中（200字）|美妆"
+
+
+def synthetic_themes(count, rng):
+    """地点 + 前缀 + 主题 + 后缀的随机组合（约 23 万种），互不相同"""
+    themes, seen = [], set()
+    while len(themes) < count:
+        theme = rng.choice(PLACES) + rng.choice(PREFIXES) + rng.choice(SUBJECTS) + rng.choice(SUFFIXES)
+        if theme not in seen:
+            seen.add(theme)
+            themes.append(theme)
+    return themes
+
+
+def perturb(theme, rng):
+    """模拟用户换种说法：替换一个字或插入一个修饰字"""
+    chars = list(theme)
+    position = rng.randrange(len(chars))
+    if rng.random() < 0.5:
+        chars[position] = rng.choice("天的小超")
+    else:
+        chars.insert(position, rng.choice("小超很"))
+    return "".join(chars)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="相似主题索引（MinHash/LSH）基准")
+    parser.add_argument("--entries", type=int, default=100000, help="索引条目数")
+    parser.add_argument("--queries", type=int, default=2000, help="近似改写查询数（另有同样数量的无关查询）")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="结果另存为 JSON 文件")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    themes = synthetic_themes(args.entries, rng)
+    with tempfile.TemporaryDirectory() as directory:
+        index = SimilarIndex(os.path.join(directory, "similar.sqlite3"), max_entries=args.entries)
+        start = time.perf_counter()
+        index.add_many(NAMESPACE, ((theme, {"content": f"文案{i}"}) for i, theme in enumerate(themes)))
+        build_seconds = time.perf_counter() - start
+
+        near = [(perturb(theme, rng), theme) for theme in rng.sample(themes, min(args.queries, len(themes)))]
+        unrelated = ["".join(rng.choices(FILLER_CHARS, k=4)) + rng.choice(SUFFIXES) for _ in range(args.queries)]
+
+        latencies, recalled, false_hits, similarities = [], 0, 0, []
+        for query, original in near:
+            start = time.perf_counter()
+            match = index.lookup(NAMESPACE, query)
+            latencies.append(time.perf_counter() - start)
+            expected = jaccard(shingles(query), shingles(original)) >= index.threshold
+            if match and expected:
+                recalled += 1
+                similarities.append(match["similarity"])
+        eligible = sum(jaccard(shingles(q), shingles(o)) >= index.threshold for q, o in near)
+        for query in unrelated:
+            start = time.perf_counter()
+            if index.lookup(NAMESPACE, query):
+                false_hits += 1
+            latencies.append(time.perf_counter() - start)
+
+    result = {
+        "entries": args.entries,
+        "build_seconds": round(build_seconds, 2),
+        "lookup_ms_p50": round(percentile(latencies, 0.5) * 1000, 3),
+        "lookup_ms_p99": round(percentile(latencies, 0.99) * 1000, 3),
+        "lookup_ms_mean": round(statistics.mean(latencies) * 1000, 3),
+        "recall": round(recalled / eligible, 3) if eligible else None,
+        "recall_eligible": eligible,
+        "mean_similarity": round(statistics.mean(similarities), 3) if similarities else None,
+        "unrelated_hit_rate": round(false_hits / len(unrelated), 3) if unrelated else None,
+    }
+    for key, value in result.items():
+        print(f"{key:<20}{value}")
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+页面冷启动基准：每轮都在全新子进程中首次运行页面脚本，统计首屏耗时（time-to-first-paint）
+Streamlit 本身在服务进程里早已加载，不计入；计入的是页面脚本及其依赖的导入与首次渲染。
+
+用法：
+    python -m bench.startup_bench
+    python -m bench.startup_bench --repeat 10 --json .cache/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["xiaohong.py", "xiaohongshu.py", "aishengcheng.py", "ai生成.py"]
+HEAVY_MODULES = ["langchain_openai", "openai", "tiktoken"]
+
+# 子进程探针：先导入 Streamlit 测试框架（模拟服务进程已就绪），再计时首次运行页面
+PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "ttfp_ms": elapsed * 1000,
+    "errors": [str(e.value) for e in at.exception],
+    "heavy_loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_page(page, repeat):
+    """返回单个页面多轮冷启动的统计结果"""
+    env = dict(os.environ, SCHOLARMIND_HTTP_WARMUP="0")  # 基准不依赖外网
+    samples, errors, heavy_loaded = [], [], set()
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE, os.path.join(ROOT, page)],
+            cwd=ROOT, env=env, capture_output=True, text=True, timeout=300
+        )
+        if result.returncode != 0:
+            errors.append(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error")
+            continue
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(probe["ttfp_ms"])
+        errors.extend(probe["errors"])
+        heavy_loaded.update(probe["heavy_loaded"])
+    return {
+        "page": page,
+        "runs": len(samples),
+        "ttfp_ms_median": round(statistics.median(samples), 1) if samples else None,
+        "ttfp_ms_min": round(min(samples), 1) if samples else None,
+        "ttfp_ms_max": round(max(samples), 1) if samples else None,
+        "heavy_modules_at_first_paint": sorted(heavy_loaded),
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="页面冷启动（首屏耗时）基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每个页面的冷启动轮数")
+    parser.add_argument("--pages", nargs="+", default=PAGES, help="要测量的页面脚本")
+    parser.add_argument("--json", help="结果另存为 JSON 文件，便于版本间对比")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'页面':<18}{'中位数(ms)':>12}{'最小(ms)':>12}{'最大(ms)':>12}  首屏已加载的重量级模块")
+    for page in args.pages:
+        stats = measure_page(page, args.repeat)
+        results.append(stats)
+        print(f"{page:<18}{stats['ttfp_ms_median'] or '-':>12}{stats['ttfp_ms_min'] or '-':>12}"
+              f"{stats['ttfp_ms_max'] or '-':>12}  {', '.join(stats['heavy_modules_at_first_paint']) or '无'}")
+        for error in stats["errors"]:
+            print(f"    ⚠️ {error}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "pages": results},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+与 Streamlit 界面无关的生成核心，页面、批处理脚本、压测工具共用
+- moonshot：API 接入（连接池、密钥验证缓存、HTTP 直连调用）
+- chains：提示词模板与调用链注册表（客户端/链缓存、已验证客户端）
+- xhs_copy：小红书爆款文案（xiaohong.py）
+- xhs_note：小红书标题/正文/标签（xiaohongshu.py）
+- xhs_score：小红书文案候选的向量化本地打分（best-of-N 排序）
+- scholar：ScholarMind 选题/综述/摘要/引用（aishengcheng.py、ai生成.py）
+- dag：依赖感知的并发调度
+- response_cache：持久化响应缓存
+- history_store：创作历史持久化（分页、搜索、按需读取正文）
+- history_export：创作历史流式批量导出（ZIP / JSONL / Markdown）
+- metrics：上游调用延迟/token/错误/兜底指标，快照落盘供管理页与 Prometheus 使用
+- rate_limit：进程级 RPM/TPM 限流与按会话公平排队
+- circuit_breaker：上游连续超时/5xx 时熔断，熔断期间快速失败走兜底，冷却后半开探测
+- hedge：对冲请求，慢于近期 P95 时再发一份取先返回者，额外请求受预算限制
+- model_router：离线 token 估算，按 提示词 + max_tokens 在 8k/32k/128k 中选能装下的最小模型
+- singleflight：进行中的相同请求合并为一次上游调用
+- similar_index：相似主题索引（MinHash/LSH），提示复用相近输入的已有结果
+- literature_store：本地文献库（BibTeX/RIS/CSV 导入，字词倒排 + MaxScore 检索），为综述与引用提供文献
+- literature_pack：文献包（定长记录 + 字符串表 + 倒排的只读格式），多进程内存映射共享，离线编译
+- templates：离线模板引擎（预编译、按槽位的可复现随机流、组合枚举去重），供兜底文案与压测造数
+"""
@@ -0,0 +1,397 @@
+"""
+LangChain 提示词与调用链注册表，不依赖 Streamlit
+- 提示词在各模块导入时登记为带变量的模板，ChatPromptTemplate 全进程只构建一次
+- 客户端按 (密钥哈希, 模型, 温度, max_tokens) 缓存，所有客户端共用一个 httpx 连接池
+- 链（提示词 | 模型 | 解析器）按 客户端 + 提示词名 缓存，并统计命中率
+- 每条链挂一个指标回调，记录模型调用的耗时、结果和 token 用量（op 为提示词名）
+- 模型前先准入：按 提示词长度 + max_tokens 向进程级限流器排队，熔断中直接失败；预扣的 token 在指标回调里按实际用量结算
+- 429 时重新准入再发（限流器已按 Retry-After 暂停），不用 openai SDK 的自动重试
+- hedged_invoke / hedged_stream：按提示词名统计耗时，慢于 P95 时发出对冲请求（见 core.hedge），落败的流被关闭
+- route_prompt：按填入变量后的提示词 + max_tokens 选能装下的最小模型（见 core.model_router）
+- generate_choices：一次请求取多个回复（n 参数），供 best-of-N 使用
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from core.circuit_breaker import moonshot_breaker
+from core.hedge import hedger
+from core.lazy import lazy_import
+from core.metrics import classify_error, metrics, record_usage, track_call
+from core.moonshot import (
+    build_chat_model, hash_api_key, is_rate_limited, langchain_components, RATE_LIMIT_RETRIES, ValidatedKeyCache
+)
+from core.model_router import estimate_tokens, model_router
+from core.rate_limit import rate_limiter
+
+MAX_CLIENTS = 128  # 缓存的客户端上限（按最近使用淘汰）
+DEFAULT_COMPLETION_TOKENS = 1000  # 客户端未设 max_tokens 时，限流按该值预估回复长度
+RESERVED_TOKENS_KEY = "rate_limit_reserved_tokens"  # 模型调用 metadata 中准入预扣的 token 数，由指标回调结算
+CANCEL_KEY = "stream_cancel"  # configurable 中的 threading.Event：置位后模型流在下一个 chunk 处关闭
+
+_prompt_messages = {}  # {提示词名: [(角色, 模板文本)]}
+_prompt_templates = {}  # {提示词名: ChatPromptTemplate}
+_prompt_lock = threading.Lock()
+
+
+def register_prompt(name, messages):
+    """登记提示词模板（模板变量用 {变量名}），首次使用时才构建 ChatPromptTemplate"""
+    _prompt_messages[name] = list(messages)
+
+
+def prompt_messages(name, inputs):
+    """按登记的模板文本填入变量，得到 [(角色, 文本)]；只用于估算 token，不构建 LangChain 对象"""
+    return [(role, template.format(**inputs)) for role, template in _prompt_messages[name]]
+
+
+def route_prompt(name, inputs, max_tokens=None):
+    """选能装下 提示词 + max_tokens 的最小模型，装不下时抛出 ContextTooLongError"""
+    model, _ = model_router.route_messages(prompt_messages(name, inputs), max_tokens or DEFAULT_COMPLETION_TOKENS, name)
+    return model
+
+
+def get_prompt(name):
+    template = _prompt_templates.get(name)
+    if template is None:
+        with _prompt_lock:
+            template = _prompt_templates.get(name)
+            if template is None:
+                _, ChatPromptTemplate, _ = langchain_components()
+                template = ChatPromptTemplate.from_messages(_prompt_messages[name])
+                _prompt_templates[name] = template
+    return template
+
+
+# -------------------------- 指标回调 --------------------------
+_handler_class = None
+
+
+def _token_usage(result):
+    """从 LLMResult 取 usage：非流式在 llm_output，流式（若上游返回）在消息的 usage_metadata"""
+    usage = (result.llm_output or {}).get("token_usage")
+    if usage:
+        return usage
+    for generations in result.generations:
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage_metadata:
+                return {
+                    "prompt_tokens": usage_metadata.get("input_tokens", 0),
+                    "completion_tokens": usage_metadata.get("output_tokens", 0)
+                }
+    return None
+
+
+def _total_tokens(usage):
+    """usage 中的总 token 数；上游未返回 usage 时为 None（限流器不退还预扣）"""
+    if not usage:
+        return None
+    return usage.get("total_tokens") or usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+
+def metrics_handler(op):
+    """返回记录链内模型调用 耗时/结果/token 用量的 LangChain 回调，同时向熔断器报告调用结果（回调类在首次使用时定义）"""
+    global _handler_class
+    if _handler_class is None:
+        BaseCallbackHandler = lazy_import("langchain_core.callbacks").BaseCallbackHandler
+
+        class ChainMetricsHandler(BaseCallbackHandler):
+            def __init__(self, op):
+                self.op = op
+                self._starts = {}  # {run_id: 开始时间}，同一条链可被多个线程同时调用
+                self._reserved = {}  # {run_id: 准入时预扣的 token 数}
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+                self._starts[run_id] = time.perf_counter()
+                reserved = (metadata or {}).get(RESERVED_TOKENS_KEY)
+                if reserved:
+                    self._reserved[run_id] = reserved
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                self._finish(run_id, "ok")
+                usage = _token_usage(response)
+                record_usage(self.op, usage)
+                self._settle(run_id, _total_tokens(usage))
+                moonshot_breaker.record_success()
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                self._settle(run_id, 0)  # 没有产出，预扣的 token 全部退回
+                if not isinstance(error, Exception):  # 页面重跑、对冲落败的流被关闭等中断：结果未知，只释放探测名额
+                    self._finish(run_id, "cancelled")
+                    moonshot_breaker.release_probe()
+                    return
+                self._finish(run_id, "rate_limited" if is_rate_limited(error) else classify_error(error))
+                moonshot_breaker.record_failure(error)
+
+            def _finish(self, run_id, outcome):
+                start = self._starts.pop(run_id, None)
+                if start is not None:
+                    metrics.observe(self.op, time.perf_counter() - start, outcome)
+
+            def _settle(self, run_id, used):
+                reserved = self._reserved.pop(run_id, None)
+                if reserved is not None:
+                    rate_limiter.settle(reserved, used)
+
+        _handler_class = ChainMetricsHandler
+    return _handler_class(op)
+
+
+def admit(estimated_tokens):
+    """检查熔断器后向限流器排队；排队被打断（页面重跑等）时释放已占用的半开探测名额"""
+    moonshot_breaker.before_call()  # 熔断中直接失败，不进入排队
+    try:
+        rate_limiter.acquire(estimated_tokens)
+    except BaseException:
+        moonshot_breaker.release_probe()
+        raise
+
+
+def retry_rate_limited(call):
+    """执行 call()（内含准入），429 时重新调用：响应钩子已让限流器暂停，重新排队即在 Retry-After 之后发出"""
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == RATE_LIMIT_RETRIES or not is_rate_limited(e):
+                raise
+
+
+_admitted_class = None
+
+
+def admission_step(llm):
+    """
+    准入 + 模型：排到配额后才调用模型，预扣的 token 数经模型调用的 metadata 交给指标回调结算
+    准入与模型放在同一步：RunnableSequence 的各步在复制的上下文中执行、batch 时还分属不同线程，预扣值带不到下一步
+    """
+    global _admitted_class
+    if _admitted_class is None:
+        Runnable = lazy_import("langchain_core.runnables").Runnable
+
+        class AdmittedModel(Runnable):
+            def __init__(self, llm):
+                self.llm = llm
+                self.name = "rate_limit_admission"
+                self.completion_tokens = getattr(llm, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS
+
+            def _admitted_config(self, prompt_value, config):
+                estimated = estimate_tokens(prompt_value.to_string()) + self.completion_tokens
+                admit(estimated)
+                return {**config, "metadata": {**config.get("metadata", {}), RESERVED_TOKENS_KEY: estimated}}
+
+            def invoke(self, input, config=None, **kwargs):
+                return self._call_with_config(self._invoke, input, config, **kwargs)
+
+            def _invoke(self, prompt_value, config):
+                def call():
+                    return self.llm.invoke(prompt_value, self._admitted_config(prompt_value, config))
+
+                return retry_rate_limited(call)
+
+            def stream(self, input, config=None, **kwargs):
+                return self.transform(iter([input]), config, **kwargs)
+
+            def transform(self, input, config=None, **kwargs):
+                yield from self._transform_stream_with_config(input, self._transform, config, **kwargs)
+
+            def _transform(self, prompt_values, config):
+                prompt_value = None
+                for prompt_value in prompt_values:  # 提示词一次产出，取最后一个
+                    pass
+                cancel = config.get("configurable", {}).get(CANCEL_KEY)
+                for attempt in range(RATE_LIMIT_RETRIES + 1):
+                    streamed = False  # 已产出 chunk 后再失败不能重发，否则调用方收到重复内容
+                    try:
+                        chunks = self.llm.stream(prompt_value, self._admitted_config(prompt_value, config))
+                        for chunk in chunks:
+                            if cancel is not None and cancel.is_set():
+                                chunks.close()  # 关闭响应流，上游停止生成；指标回调按中断结算
+                                return
+                            streamed = True
+                            yield chunk
+                        return
+                    except Exception as e:
+                        if streamed or attempt == RATE_LIMIT_RETRIES or not is_rate_limited(e):
+                            raise
+
+        _admitted_class = AdmittedModel
+    return _admitted_class(llm)
+
+
+def compose_chain(prompt_name, llm):
+    """提示词 | 准入 + 模型 | 解析器，并挂上指标回调"""
+    _, _, StrOutputParser = langchain_components()
+    chain = get_prompt(prompt_name) | admission_step(llm) | StrOutputParser()
+    return chain.with_config(callbacks=[metrics_handler(prompt_name)])
+
+
+def hedged_invoke(chain, prompt_name, inputs, hedge=None):
+    """
+    chain.invoke，慢于该提示词近期 P95 时再发一份，取先返回的结果
+    可能对冲时按流式发出再拼接：落败的流被关闭，上游不再生成，其预扣的 token 由指标回调退回
+    """
+    if hedger.enabled if hedge is None else hedge:
+        return "".join(hedged_stream(chain, prompt_name, inputs, hedge=hedge))
+    return hedger.call(prompt_name, lambda cancelled: chain.invoke(inputs), hedge=hedge)
+
+
+def cancellable_stream(chain, inputs):
+    """
+    chain.stream，关闭生成器时先通知模型步骤停止再关闭链
+    直接关闭 chain.stream 不会停止请求：链的各步为记录完整输入会把上游剩余的 chunk 读完
+    """
+    cancel = threading.Event()
+    chunks = chain.stream(inputs, {"configurable": {CANCEL_KEY: cancel}})
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        cancel.set()
+        chunks.close()
+
+
+def hedged_stream(chain, prompt_name, inputs, hedge=None):
+    """chain.stream，首 chunk 慢于近期 P95 时再发一份，先出首 chunk 的流胜出，另一个流被关闭"""
+    return hedger.stream(prompt_name, lambda: cancellable_stream(chain, inputs), hedge=hedge)
+
+
+def generate_choices(prompt_name, llm, inputs, n):
+    """
+    一次请求取 n 个回复（OpenAI 兼容的 n 参数），返回文本列表
+    链的解析器只取第一个回复，这里直接调用模型；熔断检查、限流预扣（按 n 份回复）与结算、指标回调与链一致
+    """
+    prompt_value = get_prompt(prompt_name).invoke(inputs)
+    completion_tokens = (getattr(llm, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS) * n
+    estimated_tokens = estimate_tokens(prompt_value.to_string()) + completion_tokens
+    messages = [prompt_value.to_messages()]
+
+    def generate():
+        admit(estimated_tokens)
+        return llm.generate(messages, n=n, callbacks=[metrics_handler(prompt_name)],
+                            metadata={RESERVED_TOKENS_KEY: estimated_tokens})
+
+    result = retry_rate_limited(generate)
+    return [generation.text for generation in result.generations[0]]
+
+
+class ChainRegistry:
+    """按 (密钥哈希, 模型, 温度, max_tokens) 缓存客户端及其上组合好的链（线程安全，LRU）"""
+
+    def __init__(self, max_clients=MAX_CLIENTS):
+        self.max_clients = max_clients
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {客户端键: {"llm": 客户端, "chains": {提示词名: 链}}}
+        self._keys_by_llm = {}  # {id(客户端): 客户端键}，供只持有客户端的调用方反查
+
+    def _entry(self, client_key, api_key):
+        """取（或创建）客户端条目，调用方需持有锁"""
+        entry = self._entries.get(client_key)
+        if entry is None:
+            _, model, temperature, max_tokens = client_key
+            entry = {"llm": build_chat_model(api_key, model, temperature, max_tokens), "chains": {}}
+            self._entries[client_key] = entry
+            self._keys_by_llm[id(entry["llm"])] = client_key
+            while len(self._entries) > self.max_clients:
+                _, evicted = self._entries.popitem(last=False)
+                self._keys_by_llm.pop(id(evicted["llm"]), None)
+        self._entries.move_to_end(client_key)
+        return entry
+
+    def _chain(self, entry, prompt_name):
+        """取（或组合）条目上的链并计数，调用方需持有锁"""
+        chain = entry["chains"].get(prompt_name)
+        if chain is not None:
+            self.hits += 1
+            return chain
+        self.misses += 1
+        chain = compose_chain(prompt_name, entry["llm"])
+        entry["chains"][prompt_name] = chain
+        return chain
+
+    def llm(self, api_key, model, temperature, max_tokens=None):
+        """返回缓存的 ChatOpenAI 客户端"""
+        client_key = (hash_api_key(api_key), model, round(float(temperature), 3), max_tokens)
+        with self._lock:
+            return self._entry(client_key, api_key)["llm"]
+
+    def get(self, prompt_name, api_key, model, temperature, max_tokens=None):
+        """返回 提示词 | 客户端 | 解析器 组成的链，同参数重复调用直接复用"""
+        client_key = (hash_api_key(api_key), model, round(float(temperature), 3), max_tokens)
+        with self._lock:
+            return self._chain(self._entry(client_key, api_key), prompt_name)
+
+    def for_llm(self, prompt_name, llm, inputs=None):
+        """
+        按已有客户端取链；客户端不在注册表中（如已被淘汰）时临时组合，不缓存
+        给出 inputs 时先按上下文需求选模型，客户端的模型装不下则换用同密钥、同参数的更大模型
+        """
+        if inputs is not None:
+            model = route_prompt(prompt_name, inputs, llm.max_tokens)
+            if model != llm.model_name:
+                return self.get(prompt_name, llm.openai_api_key.get_secret_value(), model, llm.temperature, llm.max_tokens)
+        with self._lock:
+            client_key = self._keys_by_llm.get(id(llm))
+            entry = self._entries.get(client_key) if client_key else None
+            if entry is not None and entry["llm"] is llm:
+                self._entries.move_to_end(client_key)
+                return self._chain(entry, prompt_name)
+            self.misses += 1
+        return compose_chain(prompt_name, llm)
+
+    def discard(self, llm):
+        """移除客户端及其上的全部链（如上游返回鉴权错误）"""
+        with self._lock:
+            client_key = self._keys_by_llm.pop(id(llm), None)
+            if client_key is not None:
+                self._entries.pop(client_key, None)
+
+    def stats(self):
+        """返回链命中/未命中计数、命中率、缓存的客户端数和链数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "clients": len(self._entries),
+                "chains": sum(len(entry["chains"]) for entry in self._entries.values()),
+            }
+
+
+chain_registry = ChainRegistry()
+
+# -------------------------- 已验证客户端 --------------------------
+VALIDATED_MODEL = "moonshot-v1-8k"
+VALIDATED_TEMPERATURE = 0.8  # 更高随机性，适配小红书文案风格
+
+_validated_llms = ValidatedKeyCache()
+
+
+def get_validated_llm(api_key, verify=True):
+    """
+    返回已验证的 LangChain ChatOpenAI 客户端（TTL 内直接复用，不再发验证请求）
+    验证失败时抛出原始异常，由调用方决定如何提示
+    verify=False 时不发验证请求，直接返回客户端：密钥问题在首次生成时暴露（鉴权错误会让客户端失效）
+    """
+    llm = _validated_llms.get(api_key)
+    if llm is not None:
+        return llm
+
+    llm = chain_registry.llm(api_key, VALIDATED_MODEL, VALIDATED_TEMPERATURE)
+    if not verify:
+        return llm
+    # 验证LLM可用性（查询模型列表，不产生对话补全计费）
+    with moonshot_breaker.guard(), track_call("validate_llm"):
+        llm.root_client.models.list()
+    _validated_llms.put(api_key, llm)
+    return llm
+
+
+def invalidate_llm(llm):
+    """上游返回鉴权错误时，把对应的已验证客户端及其链移出缓存，下次调用重新验证"""
+    _validated_llms.invalidate_value(llm)
+    chain_registry.discard(llm)
+
@@ -0,0 +1,147 @@
+"""
+上游熔断器，不依赖 Streamlit
+- 连续 N 次超时 / 连接失败 / 5xx 后熔断（open），熔断期间的调用立即抛出 CircuitOpenError，
+  调用方照常走模板兜底或给出错误提示，不再等已知会失败的请求超时
+- 冷却时间过后进入半开（half_open），只放行一个探测请求：成功则恢复（closed），失败则重新熔断
+- 4xx（密钥错误、429 等）说明上游仍在正常响应，不计为失败
+进程内所有会话共享 moonshot_breaker；阈值通过环境变量 BREAKER_FAILURES / BREAKER_COOLDOWN 配置。
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))  # 连续失败多少次后熔断
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))  # 熔断后多久（秒）放行探测请求
+PROBE_TIMEOUT = 200.0  # 探测请求超过该时长（秒）仍无结果（如页面重跑中断）时，允许另一个请求接替探测
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断期间拒绝调用"""
+
+    def __init__(self, retry_in):
+        self.retry_in = retry_in
+        super().__init__(f"月之暗面服务暂时不可用（已熔断），约 {retry_in:.0f} 秒后自动重试")
+
+
+def is_upstream_failure(e):
+    """超时、连接失败、5xx 计为上游故障；其余（4xx、解析错误等）不计"""
+    name = type(e).__name__
+    if "Timeout" in name or "Connection" in name:
+        return True
+    status_code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class CircuitBreaker:
+    """连续失败计数的熔断器（线程安全）"""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN, probe_timeout=PROBE_TIMEOUT):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probe_started = None  # 半开时在途探测请求的开始时间
+        self.trips = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def _current_state(self, now):
+        """冷却结束的熔断状态视为半开，调用方需持有锁"""
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def before_call(self):
+        """调用上游前检查：放行则返回，熔断中抛出 CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and (self._probe_started is None or now - self._probe_started >= self.probe_timeout):
+                self._probe_started = now
+                return
+            self.rejected += 1
+            retry_in = self.cooldown - (now - self._opened_at) if state == OPEN else self.cooldown
+        raise CircuitOpenError(max(retry_in, 1.0))
+
+    def release_probe(self):
+        """调用被中断（页面重跑、排队被打断等）、结果未知时，只释放半开探测名额，不计成功或失败"""
+        with self._lock:
+            self._probe_started = None
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._state = CLOSED
+            self._probe_started = None
+
+    def record_failure(self, e):
+        """上游故障计数，非故障异常视同上游有响应"""
+        if not is_upstream_failure(e):
+            self.record_success()
+            return
+        with self._lock:
+            self._consecutive += 1
+            self.last_error = f"{type(e).__name__}: {e}"[:200]
+            if self._state == HALF_OPEN or self._consecutive >= self.failures:
+                if self._state != OPEN:
+                    self.trips += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+    @contextmanager
+    def guard(self):
+        """with 块内执行一次上游调用：先检查熔断状态，再按结果计数（异常继续抛出）"""
+        self.before_call()
+        try:
+            yield
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            self.release_probe()
+            raise
+        self.record_success()
+
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive = 0
+            self._probe_started = None
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive,
+                "retry_in": max(0.0, self.cooldown - (now - self._opened_at)) if state == OPEN else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+moonshot_breaker = CircuitBreaker()
+
+STATE_LABELS = {CLOSED: "🟢 正常", HALF_OPEN: "🟡 半开探测中", OPEN: "🔴 已熔断"}
+
+
+def describe_breaker(status):
+    """侧边栏展示用的一行状态说明"""
+    text = f"上游状态：{STATE_LABELS[status['state']]}"
+    if status["state"] == OPEN:
+        text += f"（约 {status['retry_in']:.0f} 秒后探测）"
+    return f"{text} ｜ 熔断 {status['trips']} 次 ｜ 快速失败 {status['rejected']} 次"
@@ -0,0 +1,61 @@
+"""依赖感知的并发调度：按阶段依赖关系提交到线程池，依赖就绪即启动"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+def _unschedulable(stages):
+    """依赖不存在或处在环上（含依赖这些阶段）的阶段名，按原顺序；为空表示全部可以调度"""
+    ready = set()
+    remaining = dict(stages)
+    progress = True
+    while remaining and progress:
+        progress = False
+        for name, (_, deps) in list(remaining.items()):
+            if all(dep in ready for dep in deps):
+                ready.add(name)
+                del remaining[name]
+                progress = True
+    return list(remaining)
+
+
+def run_stage_dag(stages, max_workers=3):
+    """
+    按依赖关系并发执行各生成阶段：无依赖的阶段同时启动，依赖就绪的阶段立即提交
+    :param stages: {阶段名: (函数, 依赖阶段名列表)}，函数签名为 func(已完成结果字典, warn)
+    :return: 生成器，按完成先后产出 (阶段名, 结果, 告警列表)；告警交给调用方处理
+    :raises ValueError: 有阶段依赖不存在的阶段或存在循环依赖（调用时立即检查，不会悄悄少跑阶段）
+    """
+    for name, (_, deps) in stages.items():
+        missing = [dep for dep in deps if dep not in stages]
+        if missing:
+            raise ValueError(f"阶段「{name}」依赖未调度的阶段：{missing}")
+    blocked = _unschedulable(stages)
+    if blocked:
+        raise ValueError(f"以下阶段处在循环依赖上（或依赖了这些阶段），无法调度：{blocked}")
+    return _run(stages, max_workers)
+
+
+def _run(stages, max_workers):
+    results = {}
+    pending = dict(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_ready():
+            for name, (func, deps) in list(pending.items()):
+                if all(dep in results for dep in deps):
+                    warnings = []
+                    context = contextvars.copy_context()  # 阶段内的上游调用仍归属当前会话排队
+                    running[executor.submit(context.run, func, dict(results), warnings.append)] = (name, warnings)
+                    del pending[name]
+
+        submit_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            finished = []
+            for future in done:
+                name, warnings = running.pop(future)
+                results[name] = future.result()
+                finished.append((name, results[name], warnings))
+            # 先提交新就绪的阶段，再把结果交给页面渲染
+            submit_ready()
+            yield from finished
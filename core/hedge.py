@@ -0,0 +1,173 @@
+"""
+对冲请求（hedged requests），不依赖 Streamlit
+- 按 op 记录最近成功调用的耗时；一次调用超过该 op 的 P95（HEDGE_PERCENTILE）仍未返回时，再发一个相同请求，
+  先成功的结果胜出，另一个被丢弃：流式调用关闭其响应流，还没发出的请求不再发出
+  （非流式调用在可能对冲时也按流式发出，落败后同样关闭响应流，见 core.chains.hedged_invoke / core.moonshot）
+- 额外请求数不超过已处理调用数的 HEDGE_BUDGET（默认 10%），超出预算时只等待原请求
+- 对冲次数、对冲胜出/落败、因预算跳过的次数记入 core.metrics（管理页与 Prometheus 可见）
+默认关闭，环境变量 HEDGE=1 开启；调用方也可逐次传 hedge=True/False。耗时样本不足 MIN_SAMPLES 时不对冲。
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+
+from core.metrics import metrics
+
+HEDGE_ENABLED = os.getenv("HEDGE", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))  # 额外请求 / 调用数 的上限
+MIN_SAMPLES = 20  # 某个 op 的耗时样本少于该数时不对冲（分位数不可靠）
+WINDOW = 200  # 每个 op 保留的最近耗时样本数
+MIN_DELAY = 0.2  # 对冲触发时间下限（秒），避免极快的调用也被重复发出
+
+_ABANDONED = object()  # 调用方已放弃（如页面重跑），两个请求的结果都丢弃
+
+
+class Hedger:
+    """按 op 统计耗时分位数并在超时未返回时发出对冲请求（线程安全）"""
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, budget=HEDGE_BUDGET, enabled=HEDGE_ENABLED):
+        self.percentile = percentile
+        self.budget = budget
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._latencies = {}  # {op: deque[秒]}
+        self.calls = 0
+        self.hedges = 0
+        self.wins = 0
+        self.over_budget = 0
+
+    def observe(self, op, seconds):
+        with self._lock:
+            samples = self._latencies.get(op)
+            if samples is None:
+                samples = self._latencies[op] = deque(maxlen=WINDOW)
+            samples.append(seconds)
+
+    def delay(self, op):
+        """对冲触发时间（秒）；样本不足时返回 None"""
+        with self._lock:
+            samples = self._latencies.get(op)
+            if samples is None or len(samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(samples)
+        return max(MIN_DELAY, ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))])
+
+    def _take_budget(self, op):
+        with self._lock:
+            if self.hedges < self.budget * self.calls:
+                self.hedges += 1
+                allowed = True
+            else:
+                self.over_budget += 1
+                allowed = False
+        metrics.add_hedge(op, "launched" if allowed else "over_budget")
+        return allowed
+
+    def call(self, op, work, discard=None, hedge=None):
+        """
+        执行 work(cancelled) 并在需要时对冲，返回先成功的结果；两个请求都失败时抛出原请求的异常
+        :param work: 发请求的函数，cancelled() 为 True 说明另一个请求已胜出，可直接放弃
+        :param discard: 落败请求的结果交给它清理（如关闭流），None 表示直接丢弃
+        :param hedge: None 时按 HEDGE 环境变量决定
+        """
+        enabled = self.enabled if hedge is None else hedge
+        delay = self.delay(op) if enabled else None
+        with self._lock:
+            self.calls += 1
+        start = time.perf_counter()
+        if delay is None:
+            result = work(lambda: False)
+            self.observe(op, time.perf_counter() - start)
+            return result
+
+        cond = threading.Condition()
+        state = {"winner": None, "errors": {}}
+
+        def run(role):
+            try:
+                value = work(lambda: state["winner"] is not None)
+            except Exception as e:
+                with cond:
+                    state["errors"][role] = e
+                    cond.notify_all()
+                return
+            with cond:
+                if state["winner"] is None:
+                    state["winner"] = (role, value)
+                    cond.notify_all()
+                    return
+            if discard is not None:
+                discard(value)
+
+        def launch(role):
+            context = contextvars.copy_context()  # 限流会话等上下文随请求带到工作线程
+            threading.Thread(target=context.run, args=(run, role), name=f"hedge-{role}", daemon=True).start()
+
+        roles = ["primary"]
+        launch("primary")
+        try:
+            with cond:
+                cond.wait_for(lambda: state["winner"] or state["errors"], timeout=delay)
+                hedged = not (state["winner"] or state["errors"]) and self._take_budget(op)
+            if hedged:
+                roles.append("hedge")
+                launch("hedge")
+            with cond:
+                cond.wait_for(lambda: state["winner"] or len(state["errors"]) == len(roles))
+                winner = state["winner"]
+        except BaseException:
+            with cond:
+                state["winner"] = state["winner"] or _ABANDONED
+            raise
+        if winner is None:
+            raise state["errors"]["primary"]
+        role, value = winner
+        if hedged:
+            won = role == "hedge"
+            with self._lock:
+                self.wins += won
+            metrics.add_hedge(op, "won" if won else "lost")
+        self.observe(op, time.perf_counter() - start)
+        return value
+
+    def stream(self, op, make_iter, hedge=None):
+        """
+        流式调用的对冲：按首个 chunk 的到达时间判断，先出首 chunk 的流胜出，另一个流被关闭
+        返回生成器，逐个产出胜出流的 chunk
+        """
+        def first_chunk(cancelled):
+            if cancelled():  # 另一个流已先出首 chunk，不再发出
+                return None, None
+            iterator = iter(make_iter())
+            for chunk in iterator:
+                if chunk:
+                    return iterator, chunk
+            return iterator, None
+
+        def close(value):
+            close_iterator = getattr(value[0], "close", None)
+            if close_iterator is not None:
+                close_iterator()
+
+        iterator, first = self.call(f"{op}:first_chunk", first_chunk, discard=close, hedge=hedge)
+        if first is None:
+            return
+        yield first
+        yield from iterator
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "wins": self.wins,
+                "over_budget": self.over_budget,
+                "hedge_rate": self.hedges / self.calls if self.calls else 0.0,
+                "win_rate": self.wins / self.hedges if self.hedges else 0.0,
+            }
+
+
+hedger = Hedger()
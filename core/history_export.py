@@ -0,0 +1,95 @@
+"""
+创作历史批量导出：ZIP / JSONL / Markdown
+记录从 HistoryStore.iter_records 分批流式读出，逐条写入目标文件，
+整个导出过程中内存里只有当前一批记录，不会把全部正文拼成一个大字符串。
+临时文件正常在下载后删除；会话没下载就关掉时留下的文件，在下一次导出开始时按存放时长清理。
+"""
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+EXPORT_PREFIX = "xhs_history_"
+STALE_EXPORT_SECONDS = 60 * 60  # 超过该时长仍未下载的导出文件视为遗留
+
+EXPORT_FORMATS = {
+    # 格式: (显示名, 扩展名, MIME)
+    "zip": ("ZIP（每篇一个 .md 文件）", "zip", "application/zip"),
+    "jsonl": ("JSONL（每行一篇）", "jsonl", "application/x-ndjson"),
+    "markdown": ("Markdown（合并为一个文件）", "md", "text/markdown"),
+}
+
+
+def safe_filename(text):
+    """替换文件名中的非法字符"""
+    for char in '/\\:*?"<>|':
+        text = text.replace(char, "-")
+    return text.strip() or "未命名"
+
+
+def render_markdown(record):
+    """单篇记录的 Markdown 表示（ZIP 条目与合并文件共用）"""
+    return (
+        f"## {record['theme']}\n\n"
+        f"- 时间：{record['time']}\n"
+        f"- 风格：{record['style']} ｜ 长度：{record['length']} ｜ 品类：{record['category']}\n\n"
+        f"{record['content']}\n"
+    )
+
+
+def write_export(records, fmt, fileobj):
+    """把记录流写入二进制文件对象，返回导出条数"""
+    count = 0
+    if fmt == "zip":
+        with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for record in records:
+                name = f"{record['id']:06d}_{safe_filename(record['theme'])}.md"
+                archive.writestr(name, render_markdown(record))
+                count += 1
+    elif fmt == "jsonl":
+        for record in records:
+            fileobj.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            count += 1
+    elif fmt == "markdown":
+        fileobj.write("# 小红书文案创作历史\n\n".encode("utf-8"))
+        for record in records:
+            fileobj.write((render_markdown(record) + "\n---\n\n").encode("utf-8"))
+            count += 1
+    else:
+        raise ValueError(f"不支持的导出格式：{fmt}")
+    return count
+
+
+def remove_stale_exports(max_age=STALE_EXPORT_SECONDS, directory=None):
+    """删除临时目录里超过 max_age 秒的导出文件（各会话遗留的），返回删除个数；其他会话刚生成的文件不受影响"""
+    directory = directory or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(EXPORT_PREFIX):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:  # 并发清理或刚被下载删除
+            continue
+    return removed
+
+
+def export_to_tempfile(records, fmt):
+    """导出到临时文件，返回 (文件路径, 导出条数)；文件由调用方负责删除，开始前先清理遗留的旧导出"""
+    remove_stale_exports()
+    fd, path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=f".{EXPORT_FORMATS[fmt][1]}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            count = write_export(records, fmt, f)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, count
@@ -0,0 +1,128 @@
+"""
+创作历史持久化：SQLite 按用户（API Key 哈希）索引，支持分页和关键词搜索
+列表只读取元数据（时间/主题/风格/品类），正文按 id 单独读取，
+页面重跑的开销只与每页条数有关，与历史总条数无关。
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "history.sqlite3"
+)
+DEFAULT_MAX_RECORDS = 10000  # 每个用户最多保留的记录数，超出后删除最早的
+SEARCH_COLUMNS = ("theme", "style", "category", "content")
+
+
+def _like_pattern(term):
+    """LIKE 模式转义，关键词中的 % 和 _ 按字面匹配"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class HistoryStore:
+    """创作历史存储（线程安全，进程内所有会话共享同一连接）"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, max_records=DEFAULT_MAX_RECORDS):
+        self.path = path
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS notes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                theme TEXT NOT NULL,
+                style TEXT NOT NULL,
+                length TEXT NOT NULL,
+                category TEXT NOT NULL,
+                content TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_owner ON notes(owner, id)")
+        self._conn.commit()
+
+    @staticmethod
+    def _where(owner, query):
+        """按用户过滤；query 按空白拆成多个关键词，需全部命中（任一列包含即可）"""
+        clauses, params = ["owner = ?"], [owner]
+        for term in (query or "").split():
+            clauses.append("(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS) + ")")
+            params.extend([_like_pattern(term)] * len(SEARCH_COLUMNS))
+        return " AND ".join(clauses), params
+
+    def add(self, owner, theme, style, length, category, content, created_at=None):
+        """保存一条记录并返回 id；超出 max_records 时删除该用户最早的记录"""
+        created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO notes (owner, created_at, theme, style, length, category, content) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (owner, created_at, theme, style, length, category, content)
+            )
+            self._conn.execute("""
+                DELETE FROM notes WHERE owner = ? AND id IN (
+                    SELECT id FROM notes WHERE owner = ? ORDER BY id DESC LIMIT -1 OFFSET ?
+                )
+            """, (owner, owner, self.max_records))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def count(self, owner, query=""):
+        where, params = self._where(owner, query)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM notes WHERE {where}", params).fetchone()[0]
+
+    def page(self, owner, page=1, page_size=10, query=""):
+        """按时间倒序返回第 page 页的元数据（不含正文）"""
+        where, params = self._where(owner, query)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, created_at, theme, style, length, category FROM notes WHERE {where} "
+                "ORDER BY id DESC LIMIT ? OFFSET ?",
+                params + [page_size, (max(1, page) - 1) * page_size]
+            ).fetchall()
+        return [
+            {"id": row[0], "time": row[1], "theme": row[2], "style": row[3], "length": row[4], "category": row[5]}
+            for row in rows
+        ]
+
+    def iter_records(self, owner, query="", batch_size=200):
+        """按时间倒序分批读取完整记录（含正文），用于流式导出；按 id 游标翻页，不用 OFFSET"""
+        where, params = self._where(owner, query)
+        last_id = None
+        while True:
+            cursor_clause = "" if last_id is None else " AND id < ?"
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, created_at, theme, style, length, category, content FROM notes "
+                    f"WHERE {where}{cursor_clause} ORDER BY id DESC LIMIT ?",
+                    params + ([] if last_id is None else [last_id]) + [batch_size]
+                ).fetchall()
+            for row in rows:
+                yield {
+                    "id": row[0], "time": row[1], "theme": row[2], "style": row[3],
+                    "length": row[4], "category": row[5], "content": row[6]
+                }
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_content(self, owner, note_id):
+        """读取单条记录的正文，不存在（或不属于该用户）返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM notes WHERE id = ? AND owner = ?", (note_id, owner)
+            ).fetchone()
+        return row[0] if row else None
+
+    def clear(self, owner):
+        """清空该用户的全部历史"""
+        with self._lock:
+            self._conn.execute("DELETE FROM notes WHERE owner = ?", (owner,))
+            self._conn.commit()
@@ -0,0 +1,55 @@
+"""
+延迟导入与导入耗时统计
+LangChain / openai 等重量级依赖只在首次生成时导入，页面首屏不承担这部分开销；
+lazy_import 记录每个模块首次导入的耗时，importtime_breakdown 给出 -X importtime 的明细。
+"""
+import importlib
+import subprocess
+import sys
+import threading
+import time
+
+_import_timings = {}  # {模块名: 首次导入耗时（秒）}
+_lock = threading.Lock()
+
+
+def lazy_import(name):
+    """首次调用时才导入模块并记录耗时；已导入的模块直接从 sys.modules 返回"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        if name in sys.modules:
+            return sys.modules[name]
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        _import_timings[name] = time.perf_counter() - start
+    return module
+
+
+def import_timings():
+    """返回本进程内经 lazy_import 首次导入的模块及耗时（秒）"""
+    with _lock:
+        return dict(_import_timings)
+
+
+def importtime_breakdown(modules, top=15):
+    """
+    在全新子进程中用 -X importtime 导入指定模块，解析导入耗时明细
+    :return: 按累计耗时降序的 [(模块名, 自身耗时ms, 累计耗时ms)]，最多 top 项
+    """
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        timeout=120
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top]
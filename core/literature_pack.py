@@ -0,0 +1,269 @@
+"""
+文献包：只读、可内存映射的紧凑文献格式，数百万条文献也能在毫秒级打开，不依赖 Streamlit
+Python 字典 + 元组每条要几百字节，且每个进程启动都要重建一遍；文献包离线编译一次，各进程 mmap 同一文件，
+记录、倒排表直接以 numpy 数组视图访问（零拷贝），物理内存由页缓存在进程间共享，不随工作进程数增长。
+
+文件布局（小端，各段 8 字节对齐）：
+- 文件头：魔数、版本、文献数、词数，以及 记录 / 词表 / 倒排 / 字符串 四段的 (偏移, 长度)
+- 记录：定长 RECORD_DTYPE（标题、作者、期刊、领域各为字符串表中的 (偏移, 长度)，另有年份）
+- 词表：按 UTF-8 字节序排列的 TERM_DTYPE，每个词在 标题/期刊/领域 三列的倒排区间，检索时二分查找
+- 倒排：int32 文献下标，按 (词, 列) 连续存放、组内递增
+- 字符串表：UTF-8 拼接，期刊/领域/作者去重后只存一份
+切词、相关性门槛与打分直接调用 core.literature_store（index_terms / rank），两者的检索结果一致。
+
+编译：
+    python -m core.literature_pack build .cache/literature.pack refs.bib more.ris .cache/literature.sqlite3
+    python -m core.literature_pack info .cache/literature.pack
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from core.literature_store import INDEX_COLUMNS, LiteratureStore, dedup_key, index_terms, iter_file, rank
+
+DEFAULT_PACK_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "literature.pack"
+)
+MAGIC = b"LITPACK\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIIII" + "QQ" * 4)  # 魔数、版本、文献数、词数、保留，四段的 (偏移, 长度)
+RECORD_DTYPE = np.dtype([
+    ("title", "<u4"), ("title_len", "<u2"),
+    ("authors", "<u4"), ("authors_len", "<u2"),
+    ("venue", "<u4"), ("venue_len", "<u2"),
+    ("field", "<u4"), ("field_len", "<u2"),
+    ("year", "<u2"),  # 0 表示缺失
+])
+RECORD = struct.Struct("<IHIHIHIHH")  # 与 RECORD_DTYPE 逐字段对应，编译时逐条追加
+TERM_DTYPE = np.dtype([("term", "<u4"), ("term_len", "<u2"), ("start", "<u4", 3), ("count", "<u4", 3)])
+MAX_STRING_BYTES = 0xFFFF
+MAX_TABLE_BYTES = 0xFFFFFFFF
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class _StringTable:
+    """编译期的字符串表：返回 (偏移, 长度)；intern=True 的字符串去重"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.interned = {}
+
+    def add(self, text, intern=False):
+        if intern and text in self.interned:
+            return self.interned[text]
+        data = text.encode("utf-8")[:MAX_STRING_BYTES]
+        ref = (self.size, len(data))
+        self.chunks.append(data)
+        self.size += len(data)
+        if self.size > MAX_TABLE_BYTES:
+            raise ValueError("文献包字符串表超过 4GB，请拆分语料")
+        if intern:
+            self.interned[text] = ref
+        return ref
+
+
+def build_pack(records, path=DEFAULT_PACK_PATH):
+    """把文献记录编译成文献包，返回文献数；先写临时文件再原子替换，正在映射旧文件的进程不受影响"""
+    strings = _StringTable()
+    rows = bytearray()
+    vocab, keys, docs, seen = {}, array("Q"), array("I"), set()
+    for record in records:
+        columns = [index_terms(record[name]) for name in INDEX_COLUMNS]
+        # 与文献库一致：同名同年只保留一条；存 16 字节摘要而不是整串，百万条也只占几十 MB
+        dedup = hashlib.blake2b(dedup_key(columns[0], record["year"]).encode("utf-8"), digest_size=16).digest()
+        if dedup in seen:
+            continue
+        seen.add(dedup)
+        doc = len(seen) - 1
+        for col, terms in enumerate(columns):
+            for term in terms:
+                keys.append(vocab.setdefault(term, len(vocab)) * 3 + col)
+                docs.append(doc)
+        rows += RECORD.pack(
+            *strings.add(record["title"]),
+            *strings.add(record["authors"], intern=True),
+            *strings.add(record["venue"], intern=True),
+            *strings.add(record["field"], intern=True),
+            record["year"] or 0,
+        )
+
+    # 倒排：按 (词, 列) 稳定排序，组内文献下标保持递增
+    keys = np.frombuffer(keys, dtype=np.uint64)
+    order = np.argsort(keys, kind="stable")
+    postings = np.frombuffer(docs, dtype=np.uint32)[order].astype("<i4")
+    groups, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    ranges = np.zeros((len(vocab), 2, 3), dtype=np.uint32)
+    ranges[groups // 3, 0, groups % 3] = starts
+    ranges[groups // 3, 1, groups % 3] = counts
+
+    words = sorted(vocab, key=lambda word: word.encode("utf-8"))
+    terms = np.zeros(len(words), dtype=TERM_DTYPE)
+    if words:
+        terms["term"], terms["term_len"] = zip(*(strings.add(word) for word in words))
+        word_ids = np.array([vocab[word] for word in words])
+        terms["start"], terms["count"] = ranges[word_ids, 0], ranges[word_ids, 1]
+
+    sections = [bytes(rows), terms.tobytes(), postings.tobytes(), b"".join(strings.chunks)]
+    offsets, offset = [], _align(HEADER.size)
+    for data in sections:
+        offsets.extend([offset, len(data)])
+        offset = _align(offset + len(data))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(seen), len(words), 0, *offsets))
+        for (section_offset, _), data in zip(zip(offsets[::2], offsets[1::2]), sections):
+            f.seek(section_offset)
+            f.write(data)
+    os.replace(tmp_path, path)
+    return len(seen)
+
+
+class LiteraturePack:
+    """只读文献包（线程安全）；首次检索/读取时才映射文件，接口与 LiteratureStore 的检索部分一致"""
+
+    def __init__(self, path=DEFAULT_PACK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mm = None
+
+    def _load(self):
+        if self._mm is not None:
+            return
+        with self._lock:
+            if self._mm is not None:
+                return
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, records, terms, _, *offsets = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION:
+                mm.close()
+                raise ValueError(f"不是可识别的文献包（版本 {VERSION}）：{self.path}")
+            self.records = np.frombuffer(mm, dtype=RECORD_DTYPE, count=records, offset=offsets[0])
+            self.terms = np.frombuffer(mm, dtype=TERM_DTYPE, count=terms, offset=offsets[2])
+            self.postings = np.frombuffer(mm, dtype="<i4", count=offsets[5] // 4, offset=offsets[4])
+            self._strings = offsets[6]
+            self._term_offsets = self.terms["term"]
+            self._term_lengths = self.terms["term_len"]
+            self._mm = mm
+
+    def _string(self, offset, length):
+        start = self._strings + int(offset)
+        return self._mm[start:start + int(length)].decode("utf-8", "ignore")
+
+    def count(self):
+        self._load()
+        return len(self.records)
+
+    def record(self, index):
+        """第 index 篇文献（与 LiteratureStore 检索结果的字段相同，不含 score）"""
+        self._load()
+        row = self.records[index]
+        return {
+            "title": self._string(row["title"], row["title_len"]),
+            "authors": self._string(row["authors"], row["authors_len"]),
+            "year": int(row["year"]) or None,
+            "venue": self._string(row["venue"], row["venue_len"]),
+            "field": self._string(row["field"], row["field_len"]),
+        }
+
+    def _find(self, term):
+        """二分查找词表，返回下标；不存在返回 -1"""
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.terms)
+        base, offsets, lengths = self._strings, self._term_offsets, self._term_lengths
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + int(offsets[mid])
+            if self._mm[start:start + int(lengths[mid])] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.terms):
+            start = base + int(offsets[lo])
+            if self._mm[start:start + int(lengths[lo])] == key:
+                return lo
+        return -1
+
+    def search(self, field, core_problem="", k=3):
+        """按 领域 + 核心问题 返回最相关的 k 篇 [{"title", "authors", "year", "venue", "field", "score"}]，不相关时为空"""
+        self._load()
+        total = len(self.records)
+        postings = {}
+        for term in index_terms(f"{field} {core_problem}"):
+            index = self._find(term)
+            if index < 0:
+                continue
+            entry = self.terms[index]
+            for col in range(len(INDEX_COLUMNS)):
+                count = int(entry["count"][col])
+                if count:
+                    start = int(entry["start"][col])
+                    postings.setdefault(term, []).append((col, self.postings[start:start + count]))
+        ids, scores = rank(postings, field, core_problem, k, total, total)
+        results = [dict(self.record(int(i)), score=round(float(score), 3)) for i, score in zip(ids, scores)]
+        results.sort(key=lambda paper: (-paper["score"], -(paper["year"] or 0)))
+        return results
+
+    def iter_records(self):
+        for i in range(self.count()):
+            yield self.record(i)
+
+
+def iter_sources(paths, field=""):
+    """逐条读出各来源的文献：BibTeX / RIS / CSV 文件，或 LiteratureStore 的 .sqlite3 库"""
+    for path in paths:
+        if path.endswith((".sqlite3", ".db")):
+            yield from LiteratureStore(path).iter_records()
+        else:
+            yield from iter_file(path, field=field)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文献包：离线编译与查看")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="把 BibTeX / RIS / CSV / 文献库编译成文献包")
+    build_parser.add_argument("output")
+    build_parser.add_argument("sources", nargs="+")
+    build_parser.add_argument("--field", default="", help="为文件来源的文献统一指定领域路径")
+    info_parser = commands.add_parser("info", help="查看文献包规模并试检索一次")
+    info_parser.add_argument("path")
+    info_parser.add_argument("--query", default="计算机科学/机器学习")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_pack(iter_sources(args.sources, args.field), args.output)
+        size = os.path.getsize(args.output)
+        print(f"{args.output}：{count} 篇，{size / 1e6:.1f}MB（{size / max(count, 1):.0f} 字节/篇），"
+              f"耗时 {time.perf_counter() - start:.1f}s")
+        return 0
+    start = time.perf_counter()
+    pack = LiteraturePack(args.path)
+    count = pack.count()
+    opened = time.perf_counter() - start
+    start = time.perf_counter()
+    results = pack.search(args.query)
+    searched = time.perf_counter() - start
+    print(f"{count} 篇，{len(pack.terms)} 个词，{len(pack.postings)} 条倒排；"
+          f"打开 {opened * 1000:.1f}ms，检索「{args.query}」{searched * 1000:.1f}ms")
+    for paper in results:
+        print(f"{paper['score']:>7.2f}  {paper['authors']}, {paper['year']}. {paper['title']}. {paper['venue']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
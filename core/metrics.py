@@ -0,0 +1,293 @@
+"""
+进程内运行指标，不依赖 Streamlit
+- 每次上游调用（HTTP 直连、LangChain 链、密钥验证）的延迟直方图与 成功/错误/超时 计数
+- 响应 usage 中的 prompt/completion token 数
+- 模板兜底（模拟数据）被使用的次数，按 op 统计，可与调用次数相除得到兜底率
+- 对冲请求（core.hedge）的发出/胜出/落败/超预算次数
+- 按上下文长度选模型（core.model_router）的结果分布
+
+每个进程定期把快照写到 .cache/metrics/<应用>-<pid>.json 和同名 .prom（Prometheus textfile 格式，
+可直接交给 node_exporter 的 textfile collector 采集）；管理页 metrics_admin.py 汇总所有进程的快照。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_METRICS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "metrics"
+)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)  # 直方图上界（秒），另有 +Inf
+FLUSH_INTERVAL = 10  # 快照落盘间隔（秒）
+
+
+def classify_error(e):
+    """requests / httpx / openai 的超时异常类名都含 Timeout，其余记为 error"""
+    return "timeout" if "Timeout" in type(e).__name__ else "error"
+
+
+class Metrics:
+    """线程安全的计数器与直方图集合"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._calls = {}  # {(op, 结果): 次数}
+        self._latency = {}  # {op: {"counts": [各桶次数..., +Inf], "sum": 总秒数, "count": 次数}}
+        self._tokens = {}  # {(op, "prompt"/"completion"): token 数}
+        self._fallbacks = {}  # {op: 次数}
+        self._hedges = {}  # {(op, 事件): 次数}，事件为 launched / won / lost / over_budget
+        self._routes = {}  # {(op, 模型): 次数}，装不下时模型记为 rejected
+
+    def observe(self, op, seconds, outcome="ok"):
+        with self._lock:
+            self._calls[(op, outcome)] = self._calls.get((op, outcome), 0) + 1
+            histogram = self._latency.setdefault(op, {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0})
+            index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+            histogram["counts"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def add_tokens(self, op, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            for kind, value in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+                if value:
+                    self._tokens[(op, kind)] = self._tokens.get((op, kind), 0) + int(value)
+
+    def add_fallback(self, op):
+        with self._lock:
+            self._fallbacks[op] = self._fallbacks.get(op, 0) + 1
+
+    def add_hedge(self, op, event):
+        with self._lock:
+            self._hedges[(op, event)] = self._hedges.get((op, event), 0) + 1
+
+    def add_route(self, op, model):
+        with self._lock:
+            self._routes[(op, model)] = self._routes.get((op, model), 0) + 1
+
+    def snapshot(self):
+        """返回可 JSON 序列化的快照"""
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "calls": [{"op": op, "outcome": outcome, "count": n} for (op, outcome), n in self._calls.items()],
+                "latency": {op: {"counts": list(h["counts"]), "sum": h["sum"], "count": h["count"]}
+                            for op, h in self._latency.items()},
+                "tokens": [{"op": op, "kind": kind, "count": n} for (op, kind), n in self._tokens.items()],
+                "fallbacks": dict(self._fallbacks),
+                "hedges": [{"op": op, "event": event, "count": n} for (op, event), n in self._hedges.items()],
+                "routes": [{"op": op, "model": model, "count": n} for (op, model), n in self._routes.items()],
+            }
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def track_call(op):
+    """
+    统计一次上游调用：耗时 + 结果（正常返回为 ok，异常按类型记为 error/timeout 后继续抛出）
+    调用方可在 with 块内设置 call["outcome"]（如非 2xx）和 call["usage"]（响应的 usage 字段）
+    """
+    call = {"outcome": "ok", "usage": None}
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        call["outcome"] = classify_error(e)
+        raise
+    finally:
+        metrics.observe(op, time.perf_counter() - start, call["outcome"])
+        record_usage(op, call["usage"])
+
+
+def record_usage(op, usage):
+    """记录 OpenAI 兼容的 usage 字段（prompt_tokens / completion_tokens）"""
+    if usage:
+        metrics.add_tokens(op, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+
+def record_fallback(op):
+    """记录一次模板兜底（返回了模拟数据而非模型结果）"""
+    metrics.add_fallback(op)
+
+
+# -------------------------- 快照落盘 --------------------------
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def _atomic_write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def flush_metrics(app, directory=DEFAULT_METRICS_DIR):
+    """把本进程快照写为 <应用>-<pid>.json 和 .prom"""
+    os.makedirs(directory, exist_ok=True)
+    instance = f"{app}-{os.getpid()}"
+    record = {"instance": instance, "app": app, "pid": os.getpid(), "updated_at": time.time(),
+              "metrics": metrics.snapshot()}
+    _atomic_write(os.path.join(directory, f"{instance}.json"), json.dumps(record, ensure_ascii=False))
+    _atomic_write(os.path.join(directory, f"{instance}.prom"), render_prometheus([record]))
+
+
+def start_metrics_export(app, directory=DEFAULT_METRICS_DIR, interval=FLUSH_INTERVAL):
+    """启动后台落盘线程（进程内只启动一次，页面每次重跑调用也无副作用），退出时再写一次"""
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                flush_metrics(app, directory)
+            except OSError:
+                pass  # 指标落盘失败不能影响业务
+
+    threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+    atexit.register(flush_metrics, app, directory)
+
+
+def load_snapshots(directory=DEFAULT_METRICS_DIR, max_age=None):
+    """读取目录下各进程的快照；max_age（秒）用于忽略已退出进程的旧文件"""
+    records = []
+    if not os.path.isdir(directory):
+        return records
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if max_age is None or time.time() - record["updated_at"] <= max_age:
+            records.append(record)
+    return records
+
+
+def remove_stale_snapshots(directory=DEFAULT_METRICS_DIR, max_age=24 * 3600):
+    """删除超过 max_age 未更新的快照文件，返回删除的实例名"""
+    removed = []
+    for record in load_snapshots(directory):
+        if time.time() - record["updated_at"] > max_age:
+            for suffix in (".json", ".prom"):
+                path = os.path.join(directory, record["instance"] + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+            removed.append(record["instance"])
+    return removed
+
+
+# -------------------------- 汇总与导出 --------------------------
+def merge_snapshots(records):
+    """合并多个进程的快照，返回 {"calls": {(op, 结果): n}, "latency": {...}, "tokens": {...}, "fallbacks": {...}, "hedges": {...}, "routes": {...}}"""
+    merged = {"buckets": list(LATENCY_BUCKETS), "calls": {}, "latency": {}, "tokens": {}, "fallbacks": {}, "hedges": {},
+              "routes": {}}
+    for record in records:
+        snapshot = record["metrics"]
+        for row in snapshot["calls"]:
+            key = (row["op"], row["outcome"])
+            merged["calls"][key] = merged["calls"].get(key, 0) + row["count"]
+        for op, histogram in snapshot["latency"].items():
+            target = merged["latency"].setdefault(op, {"counts": [0] * len(histogram["counts"]), "sum": 0.0, "count": 0})
+            target["counts"] = [a + b for a, b in zip(target["counts"], histogram["counts"])]
+            target["sum"] += histogram["sum"]
+            target["count"] += histogram["count"]
+        for row in snapshot["tokens"]:
+            key = (row["op"], row["kind"])
+            merged["tokens"][key] = merged["tokens"].get(key, 0) + row["count"]
+        for op, n in snapshot["fallbacks"].items():
+            merged["fallbacks"][op] = merged["fallbacks"].get(op, 0) + n
+        for row in snapshot.get("hedges", ()):  # 旧版本进程的快照没有该字段
+            key = (row["op"], row["event"])
+            merged["hedges"][key] = merged["hedges"].get(key, 0) + row["count"]
+        for row in snapshot.get("routes", ()):
+            key = (row["op"], row["model"])
+            merged["routes"][key] = merged["routes"].get(key, 0) + row["count"]
+    return merged
+
+
+def histogram_quantile(buckets, counts, q):
+    """按直方图估算分位数（桶内线性插值，与 PromQL histogram_quantile 一致）；落在 +Inf 桶时返回最大上界"""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    cumulative, lower = 0, 0.0
+    for bound, count in zip(list(buckets) + [float("inf")], counts):
+        if count and cumulative + count >= rank:
+            if bound == float("inf"):
+                return buckets[-1]
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    return buckets[-1]
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def render_prometheus(records):
+    """把快照渲染为 Prometheus 文本格式，每个进程用 instance 标签区分"""
+    lines = [
+        "# HELP moonshot_requests_total 上游调用次数（按 op 与结果）",
+        "# TYPE moonshot_requests_total counter",
+    ]
+    for record in records:
+        for row in record["metrics"]["calls"]:
+            lines.append(f"moonshot_requests_total{_labels(instance=record['instance'], op=row['op'], outcome=row['outcome'])} {row['count']}")
+    lines += [
+        "# HELP moonshot_request_duration_seconds 上游调用耗时",
+        "# TYPE moonshot_request_duration_seconds histogram",
+    ]
+    for record in records:
+        buckets = record["metrics"]["buckets"]
+        for op, histogram in record["metrics"]["latency"].items():
+            cumulative = 0
+            for bound, count in zip([f"{b:g}" for b in buckets] + ["+Inf"], histogram["counts"]):
+                cumulative += count
+                lines.append(f"moonshot_request_duration_seconds_bucket{_labels(instance=record['instance'], op=op, le=bound)} {cumulative}")
+            lines.append(f"moonshot_request_duration_seconds_sum{_labels(instance=record['instance'], op=op)} {histogram['sum']:.6f}")
+            lines.append(f"moonshot_request_duration_seconds_count{_labels(instance=record['instance'], op=op)} {histogram['count']}")
+    lines += [
+        "# HELP moonshot_tokens_total 响应 usage 中的 token 数",
+        "# TYPE moonshot_tokens_total counter",
+    ]
+    for record in records:
+        for row in record["metrics"]["tokens"]:
+            lines.append(f"moonshot_tokens_total{_labels(instance=record['instance'], op=row['op'], kind=row['kind'])} {row['count']}")
+    lines += [
+        "# HELP template_fallbacks_total 模板兜底（模拟数据）次数",
+        "# TYPE template_fallbacks_total counter",
+    ]
+    for record in records:
+        for op, n in record["metrics"]["fallbacks"].items():
+            lines.append(f"template_fallbacks_total{_labels(instance=record['instance'], op=op)} {n}")
+    lines += [
+        "# HELP moonshot_hedges_total 对冲请求事件次数（launched/won/lost/over_budget）",
+        "# TYPE moonshot_hedges_total counter",
+    ]
+    for record in records:
+        for row in record["metrics"].get("hedges", ()):
+            lines.append(f"moonshot_hedges_total{_labels(instance=record['instance'], op=row['op'], event=row['event'])} {row['count']}")
+    lines += [
+        "# HELP moonshot_model_routes_total 按上下文长度选择的模型（rejected 为最大模型也装不下）",
+        "# TYPE moonshot_model_routes_total counter",
+    ]
+    for record in records:
+        for row in record["metrics"].get("routes", ()):
+            lines.append(f"moonshot_model_routes_total{_labels(instance=record['instance'], op=row['op'], model=row['model'])} {row['count']}")
+    return "\n".join(lines) + "\n"
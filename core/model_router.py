@@ -0,0 +1,116 @@
+"""
+离线 token 估算与按上下文长度选模型，不依赖 Streamlit、不联网
+- estimate_tokens：按字符类别估算 token 数（汉字/全角符号约 1 个/字，英文单词约 4 字母 1 个，数字约 3 位 1 个，
+  emoji 等补充平面字符约 2 个），宁多勿少，供限流预扣与选模型共用
+- ModelRouter：在 moonshot-v1-8k / 32k / 128k 中选出能装下 提示词 + max_tokens 的最小模型，
+  发请求前就决定，不再因上下文超长白跑一次往返；最大模型也装不下时抛出 ContextTooLongError
+- 每次选择记入 core.metrics（管理页与 Prometheus 可见），升级到更大模型时写 INFO 日志，最近的决定保留在内存中
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 按上下文从小到大排列：越小的模型越快、越便宜
+MODEL_CONTEXTS = {
+    "moonshot-v1-8k": 8 * 1024,
+    "moonshot-v1-32k": 32 * 1024,
+    "moonshot-v1-128k": 128 * 1024,
+}
+ESTIMATE_MARGIN = 0.1  # 估算误差余量：按估算值的 110% 计算提示词占用
+MESSAGE_OVERHEAD = 4  # 每条消息的角色/分隔符开销
+REPLY_OVERHEAD = 3  # 回复起始标记
+RECENT_DECISIONS = 50
+
+_CJK_RANGES = r"\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\ufe30-\ufe4f\uff00-\uffef"  # 中日韩文字、全角标点
+_CJK = re.compile(f"[{_CJK_RANGES}]")
+_WORDS = re.compile(r"[A-Za-z]+")
+_DIGITS = re.compile(r"\d+")
+_ASTRAL = re.compile(r"[\U00010000-\U0010ffff]")
+_OTHER = re.compile(f"[^\\sA-Za-z\\d{_CJK_RANGES}\\U00010000-\\U0010ffff]")
+_LINE_BREAKS = re.compile(r"\n+")
+
+
+def estimate_tokens(text):
+    """估算一段文本的 token 数（至少 1）"""
+    if not text:
+        return 1
+    tokens = len(_CJK.findall(text))
+    tokens += sum((len(word) + 3) // 4 for word in _WORDS.findall(text))
+    tokens += sum((len(digits) + 2) // 3 for digits in _DIGITS.findall(text))
+    tokens += 2 * len(_ASTRAL.findall(text))  # emoji 通常拆成多个字节级 token
+    tokens += len(_OTHER.findall(text))  # 半角标点、符号各算 1 个
+    tokens += len(_LINE_BREAKS.findall(text))
+    return max(1, tokens)
+
+
+def estimate_messages_tokens(messages):
+    """估算一组对话消息（[(角色, 文本)] 或 [{"role", "content"}]）的提示词 token 数"""
+    total = REPLY_OVERHEAD
+    for message in messages:
+        content = message["content"] if isinstance(message, dict) else message[1]
+        total += estimate_tokens(content) + MESSAGE_OVERHEAD
+    return total
+
+
+class ContextTooLongError(ValueError):
+    """提示词 + max_tokens 超过最大模型的上下文"""
+
+
+class ModelRouter:
+    """按上下文需求选最小的模型（线程安全）"""
+
+    def __init__(self, contexts=MODEL_CONTEXTS, margin=ESTIMATE_MARGIN):
+        self.contexts = sorted(contexts.items(), key=lambda item: item[1])
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=RECENT_DECISIONS)
+        self.routed = {name: 0 for name, _ in self.contexts}
+
+    def required_context(self, prompt_tokens, max_tokens):
+        return math.ceil(prompt_tokens * (1 + self.margin)) + max_tokens
+
+    def route(self, prompt_tokens, max_tokens, op="chat_completions"):
+        """返回能装下 提示词 + max_tokens 的最小模型名"""
+        required = self.required_context(prompt_tokens, max_tokens)
+        model = next((name for name, context in self.contexts if context >= required), None)
+        decision = {"time": time.time(), "op": op, "prompt_tokens": prompt_tokens, "max_tokens": max_tokens,
+                    "required": required, "model": model or "rejected"}
+        with self._lock:
+            self._recent.append(decision)
+            if model:
+                self.routed[model] += 1
+        metrics.add_route(op, decision["model"])
+        if model is None:
+            largest, context = self.contexts[-1]
+            logger.warning("route op=%s prompt≈%d max_tokens=%d 超过 %s 上下文 %d", op, prompt_tokens, max_tokens,
+                           largest, context)
+            raise ContextTooLongError(
+                f"提示词约 {prompt_tokens} tokens + 回复上限 {max_tokens} tokens 超过最大模型 {largest} 的上下文（{context}）"
+            )
+        log = logger.info if model != self.contexts[0][0] else logger.debug
+        log("route op=%s prompt≈%d max_tokens=%d → %s", op, prompt_tokens, max_tokens, model)
+        return model
+
+    def route_messages(self, messages, max_tokens, op="chat_completions"):
+        """估算消息的提示词 token 数后选模型，返回 (模型名, 提示词估算值)"""
+        prompt_tokens = estimate_messages_tokens(messages)
+        return self.route(prompt_tokens, max_tokens, op), prompt_tokens
+
+    def recent(self):
+        """最近的选择记录（新的在前）"""
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def stats(self):
+        with self._lock:
+            return dict(self.routed)
+
+
+model_router = ModelRouter()
@@ -0,0 +1,311 @@
+"""
+月之暗面（Kimi）API 接入层，不依赖 Streamlit
+- 进程级共享的 HTTP 连接池会话（keep-alive + 预热 + 复用统计）
+- 按密钥哈希缓存的验证结果（带 TTL，鉴权失败即失效）
+- call_moonshot_api：直接 HTTP 调用，失败时通过 warn 回调通知调用方，不直接写页面
+- LangChain 组件延迟加载，所有 ChatOpenAI 共用一个 httpx 连接池（链的缓存见 core.chains）
+- 两个连接池上的 429 响应都会通知进程级限流器（core.rate_limit），全进程按 Retry-After 暂停
+- 上游连续超时/5xx 时由熔断器（core.circuit_breaker）快速失败，调用方直接走兜底
+- 可选的对冲请求（core.hedge）：调用慢于近期 P95 时再发一份，取先返回的结果
+- 未指定模型时按 提示词 + max_tokens 选能装下的最小模型（core.model_router），发请求前决定
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.circuit_breaker import moonshot_breaker
+from core.hedge import hedger
+from core.lazy import lazy_import
+from core.metrics import track_call
+from core.model_router import ContextTooLongError, estimate_messages_tokens, model_router
+from core.rate_limit import rate_limiter
+
+MOONSHOT_BASE_URL = os.getenv("MOONSHOT_BASE_URL", "https://api.moonshot.cn/v1")
+RATE_LIMIT_RETRIES = 2  # 遇到 429 时重新排队的次数（call_moonshot_api 与 LangChain 链相同）
+HTTP_POOL_SIZE = 10  # 每个主机保持的最大连接数，需覆盖同时在途的请求数
+KEY_CACHE_TTL = 30 * 60  # 验证结果的复用时长（秒），过期后重新验证
+
+
+def no_warn(message):
+    """默认告警回调：核心层不产生界面副作用"""
+
+
+def hash_api_key(api_key):
+    """缓存键只保存密钥哈希，不在内存中按明文索引密钥"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def is_auth_error(e):
+    """判断异常是否为密钥失效/无权限（401/403）"""
+    status_code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status_code in (401, 403) or type(e).__name__ in ("AuthenticationError", "PermissionDeniedError")
+
+
+def is_rate_limited(e):
+    """判断异常是否为上游限流（429）"""
+    status_code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status_code == 429 or type(e).__name__ == "RateLimitError"
+
+
+class ValidatedKeyCache:
+    """按密钥哈希保存验证结果的 TTL 缓存（线程安全，进程内所有会话共享）"""
+
+    def __init__(self, ttl=KEY_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # {密钥哈希: (值, 验证时间)}
+
+    def get(self, api_key):
+        """未过期返回缓存值，否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(hash_api_key(api_key))
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def put(self, api_key, value):
+        with self._lock:
+            self._entries[hash_api_key(api_key)] = (value, time.monotonic())
+
+    def invalidate(self, api_key):
+        with self._lock:
+            self._entries.pop(hash_api_key(api_key), None)
+
+    def invalidate_value(self, value):
+        """只拿得到缓存值（如 llm 实例）时，按值移除对应条目"""
+        with self._lock:
+            for key_hash, (cached, _) in list(self._entries.items()):
+                if cached is value:
+                    del self._entries[key_hash]
+
+
+_verified_keys = ValidatedKeyCache()
+
+# -------------------------- HTTP 连接池 --------------------------
+_session = None
+_session_lock = threading.Lock()
+_warmed_up = None
+
+
+def _note_rate_limit(response, *args, **kwargs):
+    """requests 响应钩子：429 时通知限流器"""
+    rate_limiter.note_response(response.status_code, response.headers.get("Retry-After"))
+
+
+def get_http_session():
+    """进程级共享的HTTP会话：连接池 + keep-alive，省去每次请求的DNS/TCP/TLS握手"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "User-Agent": "ScholarMind/1.0 (Streamlit)",  # 补充User-Agent
+                    "Connection": "keep-alive"
+                })
+                session.hooks["response"].append(_note_rate_limit)
+                _session = session
+    return _session
+
+
+def warm_up_connection():
+    """预热：提前完成到月之暗面的握手并放回连接池（无需密钥，进程内只执行一次）"""
+    global _warmed_up
+    if _warmed_up is None:
+        try:
+            get_http_session().head(f"{MOONSHOT_BASE_URL}/models", timeout=5)
+            _warmed_up = True
+        except requests.RequestException:
+            _warmed_up = False
+    return _warmed_up
+
+
+def connection_stats():
+    """汇总连接池统计：发出的请求数、新建的连接数、连接复用率"""
+    pools = get_http_session().get_adapter(MOONSHOT_BASE_URL).poolmanager.pools
+    requests_sent, connections_opened = 0, 0
+    for pool_key in pools.keys():
+        pool = pools.get(pool_key)
+        if pool is not None:
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+    reuse_rate = 1 - connections_opened / requests_sent if requests_sent else 0.0
+    return {"requests": requests_sent, "connections": connections_opened, "reuse_rate": reuse_rate}
+
+
+# -------------------------- HTTP 直连调用 --------------------------
+def call_moonshot_api(api_key, prompt, model=None, temperature=0.7, max_tokens=500, warn=no_warn,
+                      op="chat_completions", hedge=None):
+    """
+    直接调用月之暗面API（兼容OpenAI接口格式），失败返回 None 并通过 warn 回调说明原因
+    :param model: None 时按上下文需求自动选择（8k/32k/128k 中能装下的最小模型）
+    :param op: 指标中的调用名称（如 scholar_topics），用于区分各阶段的耗时与 token 用量
+    :param hedge: 慢于该 op 的 P95 时是否发出对冲请求（见 core.hedge），None 时按 HEDGE 环境变量决定
+    """
+    url = f"{MOONSHOT_BASE_URL}/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    messages = [{"role": "user", "content": prompt}]
+    prompt_tokens = estimate_messages_tokens(messages)
+    if model is None:
+        try:
+            model = model_router.route(prompt_tokens, max_tokens, op)
+        except ContextTooLongError as e:  # 最大模型也装不下，不发请求
+            warn(f"API调用失败，使用模拟数据：{str(e)}")
+            return None
+    # 可能对冲时按流式请求：落败的请求逐行检查 cancelled() 并关闭响应流，上游不再生成，也不再计费
+    stream = hedger.enabled if hedge is None else hedge
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": stream
+    }
+    estimated_tokens = prompt_tokens + max_tokens
+
+    def request(cancelled):
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            # 熔断中直接抛出，不排队也不等超时
+            with moonshot_breaker.guard():
+                # 排队等配额；429 时响应钩子已让限流器暂停，重新排队即可在 Retry-After 之后重试
+                rate_limiter.acquire(estimated_tokens)
+                # 对冲取消、429、超时、HTTP 错误都没有产出，预扣的 token 全部退回；成功时按实际 usage 结算
+                used = 0
+                try:
+                    if cancelled():  # 对冲的另一个请求已先返回，不再发出
+                        return None
+                    with track_call(op) as call:
+                        with get_http_session().post(url, headers=headers, json=data, timeout=30, stream=stream) as response:
+                            if response.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+                                call["outcome"] = "rate_limited"
+                                continue
+                            if response.status_code in (401, 403):
+                                _verified_keys.invalidate(api_key)
+                            response.raise_for_status()  # 抛出HTTP错误
+                            if stream:
+                                content, usage = _read_event_stream(response, cancelled)
+                            else:
+                                payload = response.json()
+                                content, usage = payload["choices"][0]["message"]["content"], payload.get("usage")
+                        if content is None:
+                            call["outcome"] = "cancelled"
+                            return None
+                        call["usage"] = usage
+                    used = (usage or {}).get("total_tokens")
+                finally:
+                    rate_limiter.settle(estimated_tokens, used)
+            return content.strip()
+
+    try:
+        return hedger.call(op, request, hedge=hedge)
+    except Exception as e:
+        warn(f"API调用失败，使用模拟数据：{str(e)}")
+        return None
+
+
+def _read_event_stream(response, cancelled):
+    """逐行读取流式（SSE）响应，返回 (回复文本, usage)；cancelled() 为 True 时关闭响应，返回 (None, None)"""
+    parts, usage = [], None
+    for line in response.iter_lines():
+        if cancelled():
+            response.close()
+            return None, None
+        line = line.decode("utf-8")  # SSE 响应头通常不带 charset，不能交给 requests 按 ISO-8859-1 解码
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        usage = chunk.get("usage") or usage
+        for choice in chunk.get("choices", []):
+            parts.append((choice.get("delta") or {}).get("content") or "")
+            usage = choice.get("usage") or usage  # 月之暗面把 usage 放在最后一个 choice 里
+    return "".join(parts), usage
+
+
+def verify_moonshot_key(api_key):
+    """验证月之暗面API密钥有效性（有效结果按密钥哈希缓存，TTL内不再请求）"""
+    if not api_key:
+        return False
+    if _verified_keys.get(api_key):
+        return True
+
+    url = f"{MOONSHOT_BASE_URL}/models"
+    headers = {"Authorization": f"Bearer {api_key}"}
+    try:
+        with track_call("verify_key") as call:
+            response = get_http_session().get(url, headers=headers, timeout=10)
+            if response.status_code != 200:
+                call["outcome"] = "error"
+    except requests.RequestException:
+        return False
+    if response.status_code != 200:
+        _verified_keys.invalidate(api_key)
+        return False
+    _verified_keys.put(api_key, True)
+    return True
+
+
+# -------------------------- LangChain 客户端 --------------------------
+def langchain_components():
+    """
+    延迟加载 LangChain 组件，返回 (ChatOpenAI, ChatPromptTemplate, StrOutputParser)
+    首次生成时才导入 langchain_openai（连带 openai/pydantic/tiktoken），页面首屏不受影响
+    """
+    # 最终兼容版导入路径（适配Python 3.13+LangChain 0.2.x）
+    chat_openai = lazy_import("langchain_openai").ChatOpenAI
+    chat_prompt_template = lazy_import("langchain_core.prompts").ChatPromptTemplate
+    str_output_parser = lazy_import("langchain_core.output_parsers").StrOutputParser
+    return chat_openai, chat_prompt_template, str_output_parser
+
+
+_openai_http_client = None
+
+
+def get_openai_http_client():
+    """
+    进程级共享的 httpx 客户端，传给每个 ChatOpenAI（http_client 参数）
+    不同密钥/参数的客户端共用同一个连接池；密钥在请求头里，由 openai SDK 逐请求设置
+    """
+    global _openai_http_client
+    if _openai_http_client is None:
+        with _session_lock:
+            if _openai_http_client is None:
+                httpx = lazy_import("httpx")
+                _openai_http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+                    timeout=httpx.Timeout(60, connect=10),
+                    # 429 时让全进程按 Retry-After 暂停；重试由 core.chains 重新排队发出，不交给 openai SDK
+                    event_hooks={"response": [_note_rate_limit]}
+                )
+    return _openai_http_client
+
+
+def build_chat_model(api_key, model, temperature, max_tokens=None, timeout=60, max_retries=0):
+    """
+    创建使用共享连接池的 ChatOpenAI 客户端（不缓存，缓存由 core.chains 负责）
+    默认关闭 openai SDK 的自动重试：SDK 的重试绕过限流器的排队，429 重试由 core.chains 重新准入后发出
+    """
+    ChatOpenAI, _, _ = langchain_components()
+    return ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        base_url=MOONSHOT_BASE_URL,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=timeout,
+        max_retries=max_retries,
+        http_client=get_openai_http_client()
+    )
@@ -0,0 +1,219 @@
+"""
+进程级限流：RPM + TPM 双令牌桶，按会话轮转的公平排队，遵守 429 的 Retry-After，不依赖 Streamlit
+- 进程内所有会话（Streamlit 每个浏览器标签页一个会话）共享同一个限流器
+- 同一会话的请求按先后排队，不同会话之间轮流放行，一个会话的批量请求不会饿死其他会话
+- 任一请求收到 429 后，全进程暂停到 Retry-After 之后再放行，而不是各自盲目重试
+配额通过环境变量 MOONSHOT_RPM / MOONSHOT_TPM 配置，设为 0 关闭对应维度的限流。
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+from core.metrics import metrics
+
+MOONSHOT_RPM = int(os.getenv("MOONSHOT_RPM", "200"))
+MOONSHOT_TPM = int(os.getenv("MOONSHOT_TPM", "128000"))
+BURST_SECONDS = 10  # 桶容量 = 10 秒的配额：允许小突发，又不会一瞬间打满整分钟配额后集中失败
+DEFAULT_RETRY_AFTER = 1.0  # 429 未带 Retry-After 时的暂停时长（秒）
+MAX_RETRY_AFTER = 60.0
+
+_session = contextvars.ContextVar("rate_limit_session", default="default")
+_on_wait = contextvars.ContextVar("rate_limit_on_wait", default=None)
+
+
+def set_admission_context(session_id, on_wait=None):
+    """
+    设置后续上游调用的归属会话和排队回调（页面每次运行开始时调用）
+    :param on_wait: 排队时调用 on_wait(前面的请求数, 预计等待秒数)，位置变化时才会再次调用；
+        排过队的请求放行时再以 on_wait(None, 0) 通知一次，便于清除提示
+    工作线程需经 contextvars.copy_context() 派生才能继承这两个设置。
+    """
+    _session.set(session_id)
+    _on_wait.set(on_wait)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回默认值"""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class TokenBucket:
+    """按分钟配额匀速补充的令牌桶（不加锁，由 RateLimiter 持锁调用）"""
+
+    def __init__(self, per_minute, burst_seconds=BURST_SECONDS):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """还需等待多少秒才有足够令牌；超过桶容量的请求按装满计算"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    __slots__ = ("session", "tokens")
+
+    def __init__(self, session, tokens):
+        self.session = session
+        self.tokens = tokens
+
+
+class RateLimiter:
+    """RPM/TPM 限流 + 按会话轮转的公平队列（线程安全）"""
+
+    def __init__(self, rpm=MOONSHOT_RPM, tpm=MOONSHOT_TPM):
+        self.rpm = rpm
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._cond = threading.Condition()
+        self._queues = {}  # {会话: deque[票据]}
+        self._ring = deque()  # 有请求在排队的会话，队首会话的第一个票据是下一个放行的
+        self._blocked_until = 0.0  # 收到 429 后全进程暂停到该时刻
+        self.admitted = 0
+        self.rate_limited = 0
+
+    @property
+    def enabled(self):
+        return self._requests is not None or self._tokens is not None
+
+    def _position(self, ticket):
+        """按轮转顺序模拟出队，返回排在该票据前面的请求数"""
+        queues = {session: list(queue) for session, queue in self._queues.items()}
+        position = 0
+        while True:
+            for session in self._ring:
+                queue = queues[session]
+                if not queue:
+                    continue
+                if queue[0] is ticket:
+                    return position
+                queue.pop(0)
+                position += 1
+
+    def _wait_time(self, ticket, now):
+        wait = max(0.0, self._blocked_until - now)
+        if self._requests:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens:
+            wait = max(wait, self._tokens.wait_time(ticket.tokens, now))
+        return wait
+
+    def _enqueue(self, ticket):
+        queue = self._queues.get(ticket.session)
+        if queue is None:
+            queue = self._queues[ticket.session] = deque()
+            self._ring.append(ticket.session)
+        queue.append(ticket)
+
+    def _remove(self, ticket):
+        """出队（放行或放弃），轮转到下一个会话"""
+        queue = self._queues[ticket.session]
+        was_head = self._ring[0] == ticket.session and queue[0] is ticket
+        queue.remove(ticket)
+        if was_head:
+            self._ring.rotate(-1)
+        if not queue:
+            del self._queues[ticket.session]
+            self._ring.remove(ticket.session)
+        self._cond.notify_all()
+
+    def acquire(self, tokens, session=None, on_wait=None):
+        """排队直到轮到本请求且 RPM/TPM 都有余量，返回排队耗时（秒）"""
+        if not self.enabled:
+            return 0.0
+        session = session or _session.get()
+        on_wait = on_wait or _on_wait.get()
+        ticket = _Ticket(session, tokens)
+        start = time.monotonic()
+        last_position = None
+        with self._cond:
+            self._enqueue(ticket)
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    is_head = bool(self._ring) and self._queues[self._ring[0]][0] is ticket
+                    wait = self._wait_time(ticket, now) if is_head else None
+                    if is_head and wait <= 0:
+                        if self._requests:
+                            self._requests.take(1, now)
+                        if self._tokens:
+                            self._tokens.take(tokens, now)
+                        self.admitted += 1
+                        self._remove(ticket)
+                        break
+                    position = self._position(ticket)
+                    if on_wait is None or position == last_position:
+                        self._cond.wait(timeout=wait if wait is not None else 1.0)
+                        continue
+                    eta = max(wait or 0.0, position * 60 / self.rpm if self.rpm else 0.0)
+                # 回调在锁外执行（可能写页面，耗时不可控）
+                last_position = position
+                on_wait(position, eta)
+        except BaseException:
+            # 页面重跑等中断：把票据移出队列，避免堵住后面的请求
+            with self._cond:
+                if ticket in self._queues.get(session, ()):
+                    self._remove(ticket)
+            raise
+        if last_position is not None:
+            on_wait(None, 0.0)
+        waited = time.monotonic() - start
+        if waited > 0.01:
+            metrics.observe("queue_wait", waited)
+        return waited
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """拿到实际 usage 后，把多扣的 token 还回桶里"""
+        if self._tokens and actual_tokens is not None and actual_tokens < estimated_tokens:
+            with self._cond:
+                self._tokens.give_back(estimated_tokens - actual_tokens)
+                self._cond.notify_all()
+
+    def note_response(self, status_code, retry_after=None):
+        """上游返回 429 时，全进程暂停到 Retry-After 之后"""
+        if status_code != 429:
+            return
+        with self._cond:
+            self.rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + parse_retry_after(retry_after))
+            self._cond.notify_all()
+
+    def status(self):
+        with self._cond:
+            return {
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "sessions": len(self._ring),
+                "blocked_for": max(0.0, self._blocked_until - time.monotonic()),
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+            }
+
+
+rate_limiter = RateLimiter()
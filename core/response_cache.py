@@ -0,0 +1,115 @@
+"""
+文案响应缓存：SQLite 持久化，跨会话、跨进程重启共享
+- 缓存键：规范化后的生成参数（去空白、全角转半角）+ 模型 + 温度
+- 淘汰策略：TTL 过期 + 按最近访问时间的 LRU，条目数有上限
+- 统计：进程内命中/未命中计数
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "responses.sqlite3"
+)
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL = 7 * 24 * 3600  # 缓存有效期（秒）
+
+
+def normalize_text(value):
+    """规范化参数文本：NFKC（全角→半角）、去首尾空白、连续空白合并为一个空格"""
+    value = unicodedata.normalize("NFKC", str(value))
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def make_cache_key(model, temperature, **params):
+    """根据模型、温度和生成参数计算缓存键（参数顺序无关）"""
+    canonical = {key: normalize_text(value) for key, value in params.items()}
+    canonical["__model__"] = model
+    canonical["__temperature__"] = round(float(temperature), 3)
+    payload = json.dumps(canonical, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """基于 SQLite 的 LRU + TTL 响应缓存（线程安全，多进程通过 WAL 共享同一文件）"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """命中返回缓存文案并刷新访问时间；未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] < self.ttl:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+            if row:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key, content):
+        """写入（或覆盖）缓存，并按 TTL/条目上限淘汰旧数据"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def clear(self):
+        """清空缓存内容和计数"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """返回命中/未命中计数、命中率和当前条目数"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+            }
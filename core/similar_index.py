@@ -0,0 +1,214 @@
+"""
+相似主题索引：字级 n-gram + MinHash 签名 + LSH 分带，SQLite 持久化，不依赖 Streamlit 和向量服务
+精确缓存键对「夏日防晒技巧」和「夏天防晒小技巧」是两条不同的键；这里按字符重合度找出相近的历史输入，
+由页面提示用户复用已有结果，而不是再调用一次模型。
+- 文本规范化后切成单字 + 相邻两字，相似度为两个集合的 Jaccard 系数
+- 签名 60 维，分 20 带 × 3 行；分带键存在带索引的表里，查询只读取命中的候选，不需要把索引载入内存
+- 每个分带只读最近的 BUCKET_SCAN_LIMIT 条，候选按命中的分带数排序，只对前 MAX_CANDIDATES 个计算精确相似度
+- 命名空间（如 页面 + 风格 + 长度 + 品类）参与分带键，不同命名空间的条目互不匹配
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from core.response_cache import normalize_text
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "similar.sqlite3"
+)
+NUM_PERM = 60
+BANDS = 20
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.4  # 「夏日防晒技巧」与「夏天防晒小技巧」约 0.41
+DEFAULT_MAX_ENTRIES = 100000
+BUCKET_SCAN_LIMIT = 64  # 每个分带最多读取最近写入的条目数，主题扎堆时查询耗时也有上界
+MAX_CANDIDATES = 10
+
+_rng = random.Random(20240617)  # 固定种子：签名需跨进程、跨重启保持一致
+# multiply-shift 哈希族 h(x) = (a*x + b) mod 2^64 的高 32 位，a 取奇数
+_MULTIPLIERS = np.array([_rng.getrandbits(64) | 1 for _ in range(NUM_PERM)], dtype=np.uint64)[:, None]
+_OFFSETS = np.array([_rng.getrandbits(64) for _ in range(NUM_PERM)], dtype=np.uint64)[:, None]
+
+
+def shingles(text):
+    """规范化后去掉空白，取全部单字和相邻两字"""
+    text = normalize_text(text).lower().replace(" ", "")
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(grams):
+    """MinHash 签名（NUM_PERM 个哈希函数各自的最小值，numpy 一次算完，uint32 数组）；空集合返回 None"""
+    if not grams:
+        return None
+    hashes = np.fromiter((_hash64(gram) for gram in grams), dtype=np.uint64, count=len(grams))
+    with np.errstate(over="ignore"):
+        return ((_MULTIPLIERS * hashes + _OFFSETS) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def band_keys(namespace, signature):
+    """每个分带（ROWS 个最小哈希）连同命名空间和分带序号哈希为 SQLite 的 64 位有符号整数"""
+    prefix = namespace.encode("utf-8") + b"\x00"
+    rows = signature.tobytes()
+    width = ROWS * signature.itemsize
+    return [
+        int.from_bytes(hashlib.blake2b(prefix + bytes([band]) + rows[band * width:(band + 1) * width],
+                                       digest_size=8).digest(), "little", signed=True)
+        for band in range(BANDS)
+    ]
+
+
+class SimilarIndex:
+    """MinHash/LSH 近似查重索引（线程安全，多进程通过 WAL 共享同一文件），逐条增量写入"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                text TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_text ON entries(namespace, text)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bands (
+                key INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL,
+                PRIMARY KEY (key, entry_id)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_entry ON bands(entry_id)")
+        self._conn.commit()
+
+    def _delete(self, ids):
+        """删除条目及其分带键，调用方需持有锁"""
+        marks = ",".join("?" * len(ids))
+        self._conn.execute(f"DELETE FROM bands WHERE entry_id IN ({marks})", ids)
+        self._conn.execute(f"DELETE FROM entries WHERE id IN ({marks})", ids)
+
+    def add(self, namespace, text, payload):
+        """
+        写入一条（payload 需可 JSON 序列化）；同一命名空间下相同文本覆盖旧条目
+        超出 max_entries 时删除最早的条目
+        """
+        self.add_many(namespace, [(text, payload)])
+
+    def add_many(self, namespace, items):
+        """批量写入 [(文本, payload)]，整批一个事务（导入历史数据、基准测试用）"""
+        with self._lock:
+            for text, payload in items:
+                signature = minhash(shingles(text))
+                if signature is None:
+                    continue
+                old = self._conn.execute(
+                    "SELECT id FROM entries WHERE namespace = ? AND text = ?", (namespace, text)
+                ).fetchone()
+                if old:
+                    self._delete([old[0]])
+                entry_id = self._conn.execute(
+                    "INSERT INTO entries (namespace, text, payload, created_at) VALUES (?, ?, ?, ?)",
+                    (namespace, text, json.dumps(payload, ensure_ascii=False), time.time())
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO bands (key, entry_id) VALUES (?, ?)",
+                    [(key, entry_id) for key in band_keys(namespace, signature)]
+                )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                stale = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM entries ORDER BY id LIMIT ?", (overflow,)
+                )]
+                self._delete(stale)
+            self._conn.commit()
+
+    def lookup(self, namespace, text, threshold=None):
+        """
+        查找同一命名空间下最相似的条目
+        :return: {"text": 原文本, "similarity": Jaccard 相似度, "payload": 写入时的内容, "created_at": 时间戳}；
+            没有达到阈值的条目时返回 None
+        """
+        threshold = self.threshold if threshold is None else threshold
+        grams = shingles(text)
+        signature = minhash(grams)
+        if signature is None:
+            return None
+        keys = band_keys(namespace, signature)
+        with self._lock:
+            self.lookups += 1
+            buckets = " UNION ALL ".join(
+                ["SELECT * FROM (SELECT entry_id FROM bands WHERE key = ? ORDER BY entry_id DESC LIMIT ?)"] * len(keys)
+            )
+            candidate_ids = [row[0] for row in self._conn.execute(
+                f"SELECT entry_id FROM ({buckets}) GROUP BY entry_id ORDER BY COUNT(*) DESC, entry_id DESC LIMIT ?",
+                (*[value for key in keys for value in (key, BUCKET_SCAN_LIMIT)], MAX_CANDIDATES)
+            )]
+            if not candidate_ids:
+                return None
+            # 只按主键取候选（带上 namespace 条件会让 SQLite 改走 (namespace, text) 索引扫描整个命名空间）
+            candidates = self._conn.execute(
+                f"SELECT id, namespace, text FROM entries WHERE id IN ({','.join('?' * len(candidate_ids))})",
+                candidate_ids
+            ).fetchall()
+            best_id, best_text, best_similarity = None, None, 0.0
+            for entry_id, candidate_namespace, candidate_text in candidates:
+                if candidate_namespace != namespace:
+                    continue
+                similarity = jaccard(grams, shingles(candidate_text))
+                if similarity > best_similarity:
+                    best_id, best_text, best_similarity = entry_id, candidate_text, similarity
+            if best_id is None or best_similarity < threshold:
+                return None
+            payload, created_at = self._conn.execute(
+                "SELECT payload, created_at FROM entries WHERE id = ?", (best_id,)
+            ).fetchone()
+            self.hits += 1
+        return {"text": best_text, "similarity": best_similarity, "payload": json.loads(payload),
+                "created_at": created_at}
+
+    def clear(self):
+        """清空索引和计数"""
+        with self._lock:
+            self._conn.execute("DELETE FROM bands")
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self.lookups = 0
+            self.hits = 0
+
+    def stats(self):
+        """返回查询次数、命中次数、命中率和当前条目数"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "entries": entries,
+            }
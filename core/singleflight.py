@@ -0,0 +1,129 @@
+"""
+相同请求合并（single-flight），不依赖 Streamlit
+同一时刻多个会话提交了规范化后相同的生成请求时，只有第一个（leader）真正调用上游，
+其余（follower）等待并共享 leader 的结果；流式请求由后台线程拉取，所有订阅者按各自进度读取同一份分片。
+leader 失败时，follower 各自重新发起调用，不会被别人的密钥错误连累。
+通过环境变量 SINGLE_FLIGHT=0 全局关闭，或在调用时传 coalesce=False 单次关闭（想要不同版本时）。
+"""
+import contextvars
+import os
+import threading
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT", "1") == "1"
+
+
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.done = False
+        self.result = None
+        self.error = None
+        self.chunks = []  # 流式请求已收到的分片
+
+
+class SingleFlight:
+    """按键合并进行中的相同请求（线程安全），并统计合并次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}  # {键: 进行中的 _Flight}
+        self.leaders = 0
+        self.followers = 0  # 被合并（没有发出自己的上游调用）的请求数
+        self.retries = 0  # leader 失败后 follower 自行重试的次数
+
+    def _join(self, key):
+        """返回 (flight, 是否为 leader)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                return flight, True
+            self.followers += 1
+            return flight, False
+
+    def _finish(self, key, flight, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            flight.result, flight.error, flight.done = result, error, True
+            flight.cond.notify_all()
+
+    def _count_retry(self):
+        with self._lock:
+            self.followers -= 1
+            self.retries += 1
+
+    def do(self, key, func, succeeded=bool):
+        """
+        执行 func()，同键的并发调用共享同一次执行的结果
+        :param succeeded: 判断结果是否成功；leader 的结果不成功时，follower 自行调用 func()
+        """
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                result = func()
+            except BaseException as e:
+                self._finish(key, flight, error=e)
+                raise
+            self._finish(key, flight, result=result)
+            return result
+        with flight.cond:
+            flight.cond.wait_for(lambda: flight.done)
+        if flight.error is None and succeeded(flight.result):
+            return flight.result
+        self._count_retry()
+        return func()
+
+    def stream(self, key, make_iter):
+        """
+        流式版本：make_iter() 返回分片迭代器；leader 在后台线程中拉取，
+        调用方（含 leader 自己）逐个读取已到达的分片，中途离开不影响其他订阅者
+        """
+        flight, leader = self._join(key)
+        if leader:
+            context = contextvars.copy_context()  # 后台线程仍归属发起会话排队（见 core.rate_limit）
+            threading.Thread(target=context.run, args=(self._pump, key, flight, make_iter), daemon=True).start()
+        position = 0
+        while True:
+            with flight.cond:
+                flight.cond.wait_for(lambda: len(flight.chunks) > position or flight.done)
+                pending = flight.chunks[position:]
+                done, error = flight.done, flight.error
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if done and position >= len(flight.chunks):
+                break
+        if error is not None:
+            if leader or position:
+                raise error
+            # 还没收到任何分片就失败：follower 自行调用
+            self._count_retry()
+            yield from make_iter()
+
+    def _pump(self, key, flight, make_iter):
+        try:
+            for chunk in make_iter():
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            self._finish(key, flight, error=e)
+        else:
+            self._finish(key, flight)
+
+    def stats(self):
+        with self._lock:
+            total = self.leaders + self.followers
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.followers,
+                "retries": self.retries,
+                "in_flight": len(self._flights),
+                "coalesced_rate": self.followers / total if total else 0.0,
+            }
+
+
+single_flight = SingleFlight()
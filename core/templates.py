@@ -0,0 +1,183 @@
+"""
+离线模板引擎，不依赖 Streamlit
+- 模板语法同 str.format（{槽位名}），只编译一次：转成 %-格式串 + 槽位顺序，渲染时只做一次 C 层格式化
+- 调用方没给值的槽位从取值池中抽取；每个槽位一条独立的随机流（由 种子 + 槽位名 派生），
+  同一种子结果可复现，增删别的槽位也不会打乱已有槽位的取值
+- 取值轴的笛卡尔积按混合进制编号，可顺序枚举或按种子无放回抽样，批量产出互不重复的渲染结果；
+  每个取值轴都会出现在结果里时，不同编号必然渲染出不同结果，直接按编号渲染，不再逐条哈希去重
+上游不可用时的兜底文案和压测造数共用这一套；吞吐基准见 python -m bench.template_bench
+"""
+import random
+from bisect import bisect_right
+from itertools import accumulate, islice
+from operator import itemgetter
+from string import Formatter
+
+from core.lazy import lazy_import
+
+SHUFFLE_LIMIT = 1 << 20  # 组合空间不超过该值时整体打乱；更大时随机抽编号并跳过重复
+
+
+class Template:
+    """编译后的模板"""
+    __slots__ = ("source", "slots", "_format", "_values")
+
+    def __init__(self, source):
+        pieces, order = [], []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            pieces.append(literal.replace("%", "%%"))
+            if field is None:
+                continue
+            if not field or spec or conversion:
+                raise ValueError(f"模板槽位只支持 {{名字}} 形式：{source!r}")
+            pieces.append("%s")
+            order.append(field)
+        self.source = source
+        self.slots = tuple(dict.fromkeys(order))  # 去重后的槽位名（按首次出现顺序）
+        self._format = "".join(pieces)
+        if not order:
+            self._values = lambda values: ()
+        elif len(order) == 1:
+            name = order[0]
+            self._values = lambda values: (values[name],)
+        else:
+            self._values = itemgetter(*order)
+
+    def render(self, values):
+        """values 为 {槽位名: 文本}，需包含全部槽位"""
+        return self._format % self._values(values)
+
+    def __repr__(self):
+        return f"Template({self.source!r})"
+
+
+def cached_render(template):
+    """
+    批量枚举用的渲染函数：按该模板自己用到的槽位取值缓存结果（缓存随函数释放）
+    每个模板只用到少数几个轴，成批变体里同一标题/正文反复出现，命中时只查一次表、不再格式化
+    """
+    cache, values_of, fmt = {}, template._values, template._format
+
+    def render(values):
+        args = values_of(values)
+        text = cache.get(args)
+        if text is None:
+            text = cache[args] = fmt % args
+        return text
+    return render
+
+
+_compiled = {}
+
+
+def compile_template(source):
+    """编译并缓存模板（同一模板文本全进程只编译一次）"""
+    template = _compiled.get(source)
+    if template is None:
+        template = _compiled[source] = Template(source)
+    return template
+
+
+def free_slots(templates, given=()):
+    """一组模板中需要从取值池抽取的槽位（排除调用方给定的），按首次出现顺序"""
+    slots = dict.fromkeys(slot for template in templates for slot in template.slots)
+    return tuple(slot for slot in slots if slot not in given)
+
+
+class SlotStreams:
+    """按槽位划分的随机流；seed 为 None 时随机取一个种子（可从 .seed 读回用于复现）"""
+
+    def __init__(self, seed=None):
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self._streams = {}
+
+    def pick(self, slot, options):
+        stream = self._streams.get(slot)
+        if stream is None:
+            stream = self._streams[slot] = random.Random(f"{self.seed}/{slot}").random
+        return options[int(stream() * len(options))]
+
+    def fill(self, values, slots, pools):
+        """把 slots 中 values 还没有的槽位从 pools 抽值补上（原地修改并返回 values）"""
+        for slot in slots:
+            if slot not in values:
+                values[slot] = self.pick(slot, pools[slot])
+        return values
+
+
+# -------------------------- 组合枚举 --------------------------
+class VariantSpace:
+    """
+    若干取值轴的笛卡尔积：编号 ↔ 每个轴的取值（最后一个轴变化最快）
+    同一轴的重复取值只保留一个，不同编号对应的取值组合必然不同
+    """
+
+    def __init__(self, axes):
+        axes = {name: tuple(dict.fromkeys(options)) for name, options in axes.items()}
+        self._fixed = {name: options[0] for name, options in axes.items() if len(options) == 1}  # 只有一个取值的轴
+        self._axes = [(name, options, len(options)) for name, options in axes.items() if len(options) != 1][::-1]
+        self.size = 1
+        for _, _, radix in self._axes:
+            self.size *= radix
+
+    def decode(self, index):
+        values = self._fixed.copy()
+        for name, options, radix in self._axes:
+            values[name] = options[index % radix]
+            index //= radix
+        return values
+
+
+class UnionSpace:
+    """多个组合空间首尾相接（如每种 场景 × 风格 各自只含用到的槽位轴），编号全局连续"""
+
+    def __init__(self, spaces):
+        self._spaces = [space for space in spaces if space.size]
+        self._starts = [0, *accumulate(space.size for space in self._spaces)]
+        self.size = self._starts.pop()
+
+    def decode(self, index):
+        position = bisect_right(self._starts, index) - 1
+        return self._spaces[position].decode(index - self._starts[position])
+
+
+def _indices(size, seed):
+    if seed is None:
+        yield from range(size)
+        return
+    if size <= SHUFFLE_LIMIT:
+        # numpy 打乱比 random.shuffle 快约 6 倍；只在按种子枚举时才导入，页面启动不受影响
+        yield from lazy_import("numpy").random.default_rng(seed).permutation(size).tolist()
+        return
+    rng = random.Random(seed)
+    seen = set()
+    while len(seen) < size:
+        index = rng.randrange(size)
+        if index not in seen:
+            seen.add(index)
+            yield index
+
+
+def unique_variants(space, render, limit, seed=None, key=None, distinct=False):
+    """
+    按编号渲染变体并去重，最多产出 limit 个（组合空间用尽则提前结束）
+    :param render: values → 结果
+    :param seed: None 时按编号顺序枚举；给定种子时无放回随机抽取，同一种子顺序可复现
+    :param key: 结果 → 去重键，默认结果本身（需可哈希）
+    :param distinct: 调用方保证不同取值渲染出的结果不同（每个轴都出现在结果里）时传 True，跳过去重
+    """
+    indices = _indices(space.size, seed)
+    if distinct:
+        yield from map(render, map(space.decode, islice(indices, limit)))
+        return
+    seen = set()
+    decode = space.decode
+    for index in indices:
+        if len(seen) >= limit:
+            return
+        item = render(decode(index))
+        item_key = item if key is None else key(item)
+        if item_key in seen:
+            continue
+        seen.add(item_key)
+        yield item
@@ -0,0 +1,201 @@
+"""
+小红书爆款文案生成核心（LangChain + Kimi），不依赖 Streamlit
+页面 xiaohong.py 与批量脚本 batch_generate.py 共用同一套提示词和调用链
+多个会话同时提交相同参数时默认合并为一次上游调用（见 core.singleflight），coalesce=False 可单独生成
+generate_xiaohongshu_candidates 一次取多篇候选并在本地打分排序（best-of-N）
+"""
+import time
+import traceback
+
+from core.chains import chain_registry, generate_choices, hedged_invoke, hedged_stream, register_prompt, route_prompt
+from core.circuit_breaker import CircuitOpenError
+from core.moonshot import hash_api_key
+from core.response_cache import make_cache_key
+from core.singleflight import SINGLE_FLIGHT_ENABLED, single_flight
+from core.xhs_score import rank_candidates
+
+MODEL_NAME = "moonshot-v1-8k"  # 缓存键与默认模型；提示词过长时按上下文需求换用更大的模型
+TEMPERATURE = 0.7  # 创意性控制
+
+# 长度对应 Token 配置
+LENGTH_TOKEN_MAP = {
+    "短（100字内）": 300,
+    "中（200字）": 500,
+    "长（300字）": 800
+}
+
+SYSTEM_PROMPT = """你是一名小红书爆款文案创作专家，精通各类风格和品类的内容创作，熟悉小红书平台的用户偏好和流行趋势。
+请严格按照以下规则生成文案：
+1. 标题：生成5个吸引人的标题，每个标题必须包含emoji，字数不超过20字，换行分隔；
+2. 正文：根据指定长度撰写，分段清晰（每段不超过2行），使用口语化表达，适当添加emoji增强情感；
+3. 流行语：自然融入小红书热门词汇（如"谁懂啊"、"绝绝子"、"亲测有效"、"YYDS"等）；
+4. 标签：结尾添加5个高度相关的话题标签，格式为#标签名，标签之间空格分隔；
+5. 输出格式：直接输出文案内容，无任何解释、说明或额外文字。"""
+
+USER_PROMPT = """创作主题：{theme}
+文案风格：{style}
+文案长度：{length}
+内容品类：{category}
+请按照上述要求创作一篇小红书爆款文案，语气亲切自然，像和朋友分享一样。"""
+
+
+register_prompt("xhs_copy", [
+    ("system", SYSTEM_PROMPT),
+    ("human", USER_PROMPT)
+])
+
+
+def xiaohongshu_model(length, inputs=None):
+    """
+    返回 (模型, max_tokens)：max_tokens 由文案长度决定；
+    给出 inputs 时按 提示词 + max_tokens 选能装下的最小模型，否则用 MODEL_NAME
+    """
+    max_tokens = LENGTH_TOKEN_MAP.get(length, 500)
+    model = route_prompt("xhs_copy", inputs, max_tokens) if inputs is not None else MODEL_NAME
+    return model, max_tokens
+
+
+def build_xiaohongshu_chain(api_key, length, inputs=None):
+    """
+    取LangChain处理链（提示模板 → 模型 → 输出解析），同一密钥+模型+长度的链只组合一次
+    同一条链既可 invoke 也可 stream，流式不再需要单独的客户端
+    """
+    model, max_tokens = xiaohongshu_model(length, inputs)
+    return chain_registry.get("xhs_copy", api_key, model, TEMPERATURE, max_tokens)
+
+
+def flight_key(api_key, theme, style, length, category):
+    """合并键：密钥哈希 + 规范化后的生成参数 + 模型 + 温度；不同密钥的请求不合并（额度、权限各算各的）"""
+    return "xhs_copy:" + make_cache_key(
+        MODEL_NAME, TEMPERATURE, api_key=hash_api_key(api_key), theme=theme, style=style, length=length,
+        category=category
+    )
+
+
+def format_error_detail(e):
+    """详细错误信息（便于调试）；熔断时只给一句说明"""
+    if isinstance(e, CircuitOpenError):
+        return f"⚡ {e}"
+    return f"""
+        错误类型：{type(e).__name__}
+        错误信息：{str(e)}
+        排查建议：
+        1. 检查API Key是否正确
+        2. 检查网络是否能访问https://api.moonshot.cn
+        3. 确认API Key有足够的调用额度
+        4. 完整错误栈：
+        {"".join(traceback.format_exception(e))}
+        """
+
+
+def generate_xiaohongshu_content(api_key, theme, style, length, category, coalesce=True):
+    """
+    基于LangChain完整框架调用 Kimi API 生成小红书文案
+    :param api_key: Kimi API Key
+    :param theme: 创作主题
+    :param style: 文案风格
+    :param length: 文案长度
+    :param category: 内容品类
+    :param coalesce: 是否与其他会话进行中的相同请求合并（想要不同版本时传 False）
+    :return: (生成的文案内容, 错误信息)
+    """
+    def invoke():
+        try:
+            inputs = {
+                "theme": theme,
+                "style": style,
+                "length": length,
+                "category": category
+            }
+            chain = build_xiaohongshu_chain(api_key, length, inputs)
+
+            # 调用LangChain链（严格使用invoke方法）
+            response = hedged_invoke(chain, "xhs_copy", inputs)
+
+            # 返回生成的文案内容
+            return response, None
+
+        except Exception as e:
+            return None, format_error_detail(e)
+
+    if not (coalesce and SINGLE_FLIGHT_ENABLED):
+        return invoke()
+    key = flight_key(api_key, theme, style, length, category)
+    return single_flight.do(key, invoke, succeeded=lambda result: result[0])
+
+
+def generate_xiaohongshu_candidates(api_key, theme, style, length, category, n=3, mode="n"):
+    """
+    best-of-N：一次取 n 篇候选，本地打分（见 core.xhs_score）后按分数从高到低返回
+    :param mode: "n" 一次请求带 n 参数；"batch" 并发发出 n 个相同请求。
+        n 参数模式拿到的候选不足 n 篇（失败或上游忽略 n）时，差额用并发请求补齐
+    :return: (候选列表 [{"content", "score", "scores"}]，全部失败时为空列表, 错误信息)
+    """
+    inputs = {
+        "theme": theme,
+        "style": style,
+        "length": length,
+        "category": category
+    }
+    texts, errors = [], []
+    try:
+        model, max_tokens = xiaohongshu_model(length, inputs)
+        if mode == "n":
+            try:
+                llm = chain_registry.llm(api_key, model, TEMPERATURE, max_tokens)
+                texts = generate_choices("xhs_copy", llm, inputs, n)[:n]
+            except Exception as e:
+                errors.append(e)
+        missing = n - len(texts)
+        if missing > 0:
+            chain = chain_registry.get("xhs_copy", api_key, model, TEMPERATURE, max_tokens)
+            for result in chain.batch([inputs] * missing, config={"max_concurrency": missing}, return_exceptions=True):
+                if isinstance(result, Exception):
+                    errors.append(result)
+                else:
+                    texts.append(result)
+    except Exception as e:
+        errors.append(e)
+
+    texts = [text for text in texts if text and text.strip()]
+    if not texts:
+        return [], format_error_detail(errors[-1]) if errors else "上游未返回任何候选"
+    return rank_candidates(texts, length), None
+
+
+def stream_xiaohongshu_content(api_key, theme, style, length, category, stats, coalesce=True):
+    """
+    流式生成小红书文案，逐段产出token，供 st.write_stream 渐进渲染
+    合并时后加入的会话先收到已生成的部分，再跟随 leader 的进度继续输出
+    :param stats: 调用方传入的字典，结束后写入：
+        content（完整文案，失败时为None）、error（错误信息）、
+        first_token_time（首token耗时，秒）、total_time（总耗时，秒）
+    """
+    stats.update(content=None, error=None, first_token_time=None, total_time=None)
+    chunks = []
+    start = time.perf_counter()
+    try:
+        inputs = {
+            "theme": theme,
+            "style": style,
+            "length": length,
+            "category": category
+        }
+        chain = build_xiaohongshu_chain(api_key, length, inputs)
+        if coalesce and SINGLE_FLIGHT_ENABLED:
+            key = "stream:" + flight_key(api_key, theme, style, length, category)  # 与非流式调用分开合并
+            source = single_flight.stream(key, lambda: hedged_stream(chain, "xhs_copy", inputs))
+        else:
+            source = hedged_stream(chain, "xhs_copy", inputs)
+        for chunk in source:
+            if not chunk:
+                continue
+            if stats["first_token_time"] is None:
+                stats["first_token_time"] = time.perf_counter() - start
+            chunks.append(chunk)
+            yield chunk
+        stats["content"] = "".join(chunks)
+    except Exception as e:
+        stats["error"] = format_error_detail(e)
+    finally:
+        stats["total_time"] = time.perf_counter() - start
@@ -0,0 +1,397 @@
+"""
+小红书笔记生成核心：标题 / 正文 / 标签（LangChain + Kimi，失败时回落到模板），不依赖 Streamlit
+页面 xiaohongshu.py 只负责参数收集和渲染；模板由 core.templates 预编译，也可离线批量造数（unique_notes）
+两种生成方式：三部分各发一次请求并发生成（generate_xhs_note_concurrently），
+或一次请求按小节流式解析、只补生成不合格的小节（generate_xhs_note_single）
+"""
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.chains import chain_registry, hedged_invoke, hedged_stream, invalidate_llm, register_prompt
+from core.metrics import record_fallback
+from core.moonshot import is_auth_error, no_warn
+from core.templates import (
+    SlotStreams,
+    UnionSpace,
+    VariantSpace,
+    cached_render,
+    compile_template,
+    free_slots,
+    unique_variants,
+)
+
+# -------------------------- 模拟文案数据（兜底用） --------------------------
+# 标题模板（按场景分类）；{topic} 以外的槽位从 SLOT_POOLS 抽取
+TITLE_TEMPLATES = {
+    "好物分享": [
+        "挖到宝了{sparkle}{topic}真的太好用了！",
+        "无限回购的{topic}，谁用谁知道👍",
+        "均价{price}的{topic}，学生党闭眼冲💸"
+    ],
+    "美妆教程": [
+        "新手必学{sparkle}{topic}化妆技巧，手残党也会！",
+        "超简单的{topic}教程，{minutes}分钟搞定出门妆💄",
+        "踩雷无数总结的{topic}干货，快码住📝"
+    ],
+    "旅行攻略": [
+        "人均{budget}玩转{topic}{sparkle}，避坑指南收好！",
+        "{topic}小众玩法，本地人都不知道🤫",
+        "{trip}{topic}攻略，不绕路不踩雷🚗"
+    ],
+    "职场干货": [
+        "打工人必看{sparkle}{topic}高效工作法，效率翻倍！",
+        "{career}，{topic}帮我少走{years}年弯路💼",
+        "超实用的{topic}技巧，老板都夸会做事👍"
+    ],
+    "情感文案": [
+        "治愈系{sparkle}{topic}，放过自己才是最好的和解",
+        "关于{topic}，我终于想通了💛",
+        "写给所有女生：{topic}才是人生的必修课🌷"
+    ]
+}
+
+# 正文模板
+CONTENT_TEMPLATES = {
+    "元气少女": "{audience}！今天一定要给你们安利{topic}😭！我真的用了好久，亲测巨好用！\n\n先说优点👉\n1. 颜值超在线，拍照巨出片📸\n2. 性价比绝了，学生党也能冲💸\n3. 效果超预期，用一次就爱上{sparkle}\n\n真的闭眼入不亏，信我！",
+    "高冷拽姐": "{topic}，没必要讨好所有人。\n\n好用就留，不好用就换，人生嘛，开心最重要😎\n\n试过很多同款，还是这个最合心意，懂的都懂。\n\n不废话，值得入。",
+    "温柔治愈": "慢慢发现，{topic}教会我的，是和生活和解💛。\n\n不用急着求结果，不用逼自己完美，一点点进步就很好。\n\n愿我们都能在{topic}里，找到属于自己的小美好{sparkle}。",
+    "搞笑沙雕": "家人们谁懂啊🤣！{topic}真的笑不活了！\n\n本来以为踩雷，结果真香现场！\n\n我宣布，{topic}就是我的年度快乐源泉，笑到邻居来敲门😂！",
+    "专业干货": "深度测评{topic}，纯干货无广📝！\n\n核心优势：\n1. 核心逻辑：XXX\n2. 实操步骤：XXX\n3. 避坑要点：XXX\n\n总结：适合XX人群，性价比{stars}。"
+}
+
+# 标签模板
+TAG_TEMPLATES = {
+    "好物分享": ["好物分享", "平价好物", "学生党必备", "无限回购", "开箱", "性价比", "生活好物", "宝藏单品", "购物分享", "自用推荐"],
+    "美妆教程": ["美妆教程", "新手化妆", "化妆技巧", "平价彩妆", "美妆干货", "手残党化妆", "妆容教程", "底妆教程", "眼妆教程", "美妆分享"],
+    "旅行攻略": ["旅行攻略", "小众旅行地", "自由行", "旅游攻略", "避坑指南", "性价比旅行", "周末去哪儿", "国内旅行", "旅行日记", "拍照攻略"],
+    "职场干货": ["职场干货", "高效工作", "打工人", "职场技巧", "升职加薪", "办公技巧", "职场生存法则", "副业赚钱", "自我提升", "职场经验"],
+    "情感文案": ["情感文案", "治愈系", "女性成长", "自我和解", "生活感悟", "正能量", "情绪价值", "内心强大", "成长型思维", "温柔文案"]
+}
+
+# 模板槽位取值池（每个池的第一个值即改造前模板里的原文）
+SLOT_POOLS = {
+    "sparkle": ["✨", "🔥", "🌟", "💥"],
+    "price": ["XX", "29", "59", "99"],
+    "minutes": ["5", "3", "10"],
+    "budget": ["500", "300", "800", "1000"],
+    "trip": ["3天2晚", "2天1晚", "4天3晚", "5天4晚"],
+    "career": ["月薪3k到1w", "从实习到主管", "入职第一年", "转行三年"],
+    "years": ["2", "1", "3"],
+    "audience": ["宝子们", "姐妹们", "家人们", "集美们"],
+    "stars": ["⭐⭐⭐⭐", "⭐⭐⭐", "⭐⭐⭐⭐⭐"],
+}
+
+_TITLES = {scene: [compile_template(t) for t in templates] for scene, templates in TITLE_TEMPLATES.items()}
+_CONTENTS = {style: compile_template(template) for style, template in CONTENT_TEMPLATES.items()}
+# {(场景, 风格): (标题模板, 正文模板, 需抽取的槽位)}，批量渲染时免去逐篇查找和计算
+_NOTES = {
+    (scene, style): (titles, content, free_slots([*titles, content], ("topic",)))
+    for scene, titles in _TITLES.items() for style, content in _CONTENTS.items()
+}
+
+
+def _note_templates(scene, style):
+    return _NOTES.get((scene, style)) or _NOTES[(
+        scene if scene in TITLE_TEMPLATES else "好物分享", style if style in CONTENT_TEMPLATES else "元气少女"
+    )]
+
+
+def template_titles(scene, topic, streams=None):
+    titles = _note_templates(scene, None)[0]
+    values = (streams or SlotStreams()).fill({"topic": topic}, free_slots(titles), SLOT_POOLS)
+    return [title.render(values) for title in titles]
+
+
+def template_content(style, topic, streams=None):
+    content = _note_templates(None, style)[1]
+    values = (streams or SlotStreams()).fill({"topic": topic}, content.slots, SLOT_POOLS)
+    return content.render(values)
+
+
+def template_tags(scene):
+    return list(TAG_TEMPLATES.get(scene, TAG_TEMPLATES["好物分享"]))
+
+
+def template_note(scene, topic, style, streams=None):
+    """整篇模板笔记（标题/正文/标签），streams 为 SlotStreams，同一种子结果相同"""
+    titles, content, slots = _note_templates(scene, style)
+    values = (streams or SlotStreams()).fill({"topic": topic}, slots, SLOT_POOLS)
+    return {
+        "titles": [title.render(values) for title in titles],
+        "content": content.render(values),
+        "tags": template_tags(scene),
+    }
+
+
+def note_space(topics, scenes=tuple(TITLE_TEMPLATES), styles=tuple(CONTENT_TEMPLATES)):
+    """主题 × 场景 × 风格 × 各自用到的槽位 组成的组合空间，供 unique_notes 枚举"""
+    spaces = []
+    for scene in scenes:
+        for style in styles:
+            axes = {"scene": [scene], "style": [style], "topic": list(topics)}
+            axes.update((slot, SLOT_POOLS[slot]) for slot in _note_templates(scene, style)[2])
+            spaces.append(VariantSpace(axes))
+    return UnionSpace(spaces)
+
+
+def _note_renderer():
+    """values → 笔记；每个 场景 × 风格 的模板各用一份 cached_render，只在本次枚举内有效"""
+    renderers = {}
+
+    def render(values):
+        scene, style = values["scene"], values["style"]
+        entry = renderers.get((scene, style))
+        if entry is None:
+            titles, content, _ = _note_templates(scene, style)
+            entry = renderers[(scene, style)] = (
+                [cached_render(title) for title in titles], cached_render(content),
+                TAG_TEMPLATES.get(scene, TAG_TEMPLATES["好物分享"])
+            )
+        titles, content, tags = entry
+        return {
+            "scene": scene,
+            "style": style,
+            "topic": values["topic"],
+            "titles": [title(values) for title in titles],
+            "content": content(values),
+            "tags": tags,
+        }
+    return render
+
+
+def unique_notes(topics, limit, seed=None, scenes=tuple(TITLE_TEMPLATES), styles=tuple(CONTENT_TEMPLATES)):
+    """
+    批量产出最多 limit 篇互不重复（标题 + 正文）的模板笔记（压测造数、离线批量兜底）
+    主题和每个槽位都出现在标题或正文里，不同编号的笔记必然不同，按编号直接渲染、不逐篇去重
+    """
+    return unique_variants(note_space(topics, scenes, styles), _note_renderer(), limit, seed=seed, distinct=True)
+
+
+# -------------------------- 提示词（模板变量：scene / topic / style） --------------------------
+register_prompt("xhs_title", [
+    ("system", "你是小红书爆款文案专家，擅长生成{style}风格的吸睛标题，带emoji，每句话不超过20字，每行1个。"),
+    ("user", """生成3个{scene}类别的小红书标题，主题是{topic}，风格{style}：
+示例：挖到宝了✨平价粉底液真的太好用了！""")
+])
+register_prompt("xhs_content", [
+    ("system", "你是小红书爆款文案专家，擅长写{style}风格的正文，带emoji，分段清晰，字数300-500字，符合小红书阅读习惯。"),
+    ("user", """写一篇{scene}类别的小红书正文，主题是{topic}，风格{style}，要求：
+1. 开头吸睛，有代入感
+2. 中间分点/分段讲核心内容
+3. 结尾有互动（比如提问/呼吁）
+4. 带合适的emoji，不要堆砌""")
+])
+register_prompt("xhs_tags", [
+    ("system", "你是小红书运营专家，擅长生成高匹配度的标签，带#，10个左右，包含核心词+长尾词。"),
+    ("user", """生成{scene}类别的小红书标签，主题是{topic}，格式：#标签1 #标签2 #标签3...""")
+])
+# 单次请求模式：标题/正文/标签一次生成，按【小节名】分隔，便于边流式边解析
+register_prompt("xhs_note", [
+    ("system", "你是小红书爆款文案专家，擅长写{style}风格的标题、正文和标签，带emoji，符合小红书阅读习惯。"),
+    ("user", """为{scene}类别写一篇小红书笔记，主题是{topic}，风格{style}。
+严格按以下格式输出，三个小节依次出现，小节名单独占一行，不要输出其他内容：
+【标题】
+3个标题，每行1个，每个不超过20字，不要编号
+【正文】
+300-500字，开头吸睛有代入感，中间分点/分段讲核心内容，结尾有互动，emoji适量不要堆砌
+【标签】
+10个左右，#开头，空格分隔，包含核心词+长尾词""")
+])
+
+# -------------------------- 结果清洗 --------------------------
+MAX_TITLE_CHARS = 20
+MIN_CONTENT_CHARS = 50  # 正文短于该字数视为不合格（多半是截断或答非所问）
+MIN_TAGS = 3
+_TITLE_PREFIX = re.compile(r"^(?:[-*•·]\s*|\d+\s*[.、:：)）]\s*|标题\s*\d*\s*[:：]\s*)")
+_TITLE_QUOTES = "\"'“”‘’「」《》*"
+
+
+def clean_titles(text):
+    """逐行去掉编号/引号等修饰后，保留不超过 20 字的标题（先清洗再按字数过滤，少丢合格标题）"""
+    titles = []
+    for line in text.splitlines():
+        title = _TITLE_PREFIX.sub("", line.strip()).strip(_TITLE_QUOTES).strip()
+        if title and len(title) <= MAX_TITLE_CHARS:
+            titles.append(title)
+    return titles
+
+
+def parse_tags(text):
+    return [t.replace("#", "").strip() for t in text.split() if t.replace("#", "").strip()]
+
+# -------------------------- 核心功能函数（小红书文案生成） --------------------------
+def generate_xhs_title(llm, scene, topic, style, warn=no_warn):
+    """生成小红书标题（3个）"""
+    if llm:
+        inputs = {"scene": scene, "topic": topic, "style": style}
+        try:
+            chain = chain_registry.for_llm("xhs_title", llm, inputs)
+            result = hedged_invoke(chain, "xhs_title", inputs)
+            titles = clean_titles(result)
+            if titles:
+                return titles[:3]
+            warn("标题不符合字数要求，使用模拟数据")
+        except Exception as e:
+            if is_auth_error(e):
+                invalidate_llm(llm)
+            warn(f"标题生成失败，使用模拟数据：{str(e)}")
+    
+    # 兜底逻辑
+    record_fallback("xhs_title")
+    return template_titles(scene, topic)
+
+def generate_xhs_content(llm, scene, topic, style, warn=no_warn):
+    """生成小红书正文"""
+    if llm:
+        inputs = {"scene": scene, "topic": topic, "style": style}
+        try:
+            chain = chain_registry.for_llm("xhs_content", llm, inputs)
+            return hedged_invoke(chain, "xhs_content", inputs)
+        except Exception as e:
+            if is_auth_error(e):
+                invalidate_llm(llm)
+            warn(f"正文生成失败，使用模拟数据：{str(e)}")
+    
+    # 兜底逻辑
+    record_fallback("xhs_content")
+    return template_content(style, topic)
+
+def generate_xhs_tags(llm, scene, topic, warn=no_warn):
+    """生成小红书标签（10个）"""
+    if llm:
+        inputs = {"scene": scene, "topic": topic}
+        try:
+            chain = chain_registry.for_llm("xhs_tags", llm, inputs)
+            result = hedged_invoke(chain, "xhs_tags", inputs)
+            tags = parse_tags(result)
+            if tags:
+                return tags[:10]
+            warn("标签结果为空，使用模拟数据")
+        except Exception as e:
+            if is_auth_error(e):
+                invalidate_llm(llm)
+            warn(f"标签生成失败，使用模拟数据：{str(e)}")
+    
+    # 兜底逻辑
+    record_fallback("xhs_tags")
+    return template_tags(scene)
+
+# -------------------------- 并发生成（标题/正文/标签同时请求） --------------------------
+def generate_xhs_note_concurrently(llm, scene, topic, style, parts=None):
+    """并发生成标题、正文、标签，按完成先后逐个产出 (组件名, 结果, 告警列表)
+
+    三个组件互不依赖，同时发出请求，总耗时约等于最慢的一次调用；
+    各组件仍各自兜底，告警先收集再交给调用方处理（页面中工作线程不能直接写页面）。
+    parts 为要生成的组件名（默认全部），单次请求模式用它只补生成不合格的小节。
+    """
+    tasks = {
+        "titles": (generate_xhs_title, (llm, scene, topic, style)),
+        "content": (generate_xhs_content, (llm, scene, topic, style)),
+        "tags": (generate_xhs_tags, (llm, scene, topic)),
+    }
+    if parts is not None:
+        tasks = {part: task for part, task in tasks.items() if part in parts}
+    if not tasks:
+        return
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {}
+        for part, (func, args) in tasks.items():
+            warnings = []
+            # 复制上下文，工作线程中的调用仍归属当前会话排队（见 core.rate_limit）
+            context = contextvars.copy_context()
+            futures[executor.submit(context.run, func, *args, warn=warnings.append)] = (part, warnings)
+        for future in as_completed(futures):
+            part, warnings = futures[future]
+            yield part, future.result(), warnings
+
+
+# -------------------------- 单次请求（一次生成三个小节，边流式边解析） --------------------------
+SECTION_NAMES = {"标题": "titles", "正文": "content", "标签": "tags"}
+SECTION_LABELS = {"titles": "标题", "content": "正文", "tags": "标签"}
+_SECTION_MARKER = re.compile(r"【(标题|正文|标签)】")
+_MARKER_CHARS = 4  # 「【标题】」的字数；缓冲区末尾不足一个标记的部分留到下次再匹配
+
+
+class SectionStreamParser:
+    """按【小节名】切分流式输出：下一个小节标记出现（或流结束）时，上一个小节才算完整"""
+
+    def __init__(self):
+        self.text = ""
+        self._scan_from = 0
+        self._current = None  # (组件名, 小节内容起点)
+
+    def feed(self, chunk):
+        """追加一段输出，返回因此变完整的 [(组件名, 小节文本)]"""
+        self.text += chunk
+        completed = []
+        for match in _SECTION_MARKER.finditer(self.text, self._scan_from):
+            if self._current:
+                completed.append((self._current[0], self.text[self._current[1]:match.start()]))
+            self._current = (SECTION_NAMES[match.group(1)], match.end())
+            self._scan_from = match.end()
+        self._scan_from = max(self._scan_from, len(self.text) - _MARKER_CHARS + 1)
+        return completed
+
+    def finish(self):
+        """流结束：最后一个小节到文本末尾为止"""
+        return [(self._current[0], self.text[self._current[1]:])] if self._current else []
+
+
+def check_section(part, text):
+    """校验并清洗一个小节，返回 (结果, 问题)；不合格时结果为 None"""
+    if part == "titles":
+        titles = clean_titles(text)
+        return (titles[:3], None) if titles else (None, f"没有不超过{MAX_TITLE_CHARS}字的标题")
+    if part == "content":
+        content = text.strip()
+        return (content, None) if len(content) >= MIN_CONTENT_CHARS else (None, "内容过短")
+    tags = parse_tags(text)
+    return (tags[:10], None) if len(tags) >= MIN_TAGS else (None, "数量不足")
+
+
+def generate_xhs_note_single(llm, scene, topic, style):
+    """一次请求流式生成标题、正文、标签，每个小节一结束就校验并产出 (组件名, 结果, 告警列表)
+
+    上游调用从三次降到一次；某个小节不合格或缺失时，只对该小节单独补生成（各自仍有模板兜底），
+    补生成放在流结束后并发进行，不耽误合格小节的渲染。流中途失败时，剩余小节直接用模板兜底。
+    """
+    if not llm:
+        yield from generate_xhs_note_concurrently(None, scene, topic, style)
+        return
+
+    inputs = {"scene": scene, "topic": topic, "style": style}
+    remaining = dict.fromkeys(SECTION_LABELS)
+    repair_notes = {}
+    parser = SectionStreamParser()
+
+    def accept(sections):
+        for part, text in sections:
+            if part not in remaining:
+                continue  # 重复的小节只取第一次
+            result, problem = check_section(part, text)
+            if result is None:
+                repair_notes.setdefault(part, f"{SECTION_LABELS[part]}{problem}，单独重新生成")
+                continue
+            del remaining[part]
+            yield part, result, []
+
+    failure = None
+    try:
+        chain = chain_registry.for_llm("xhs_note", llm, inputs)
+        for chunk in hedged_stream(chain, "xhs_note", inputs):
+            yield from accept(parser.feed(chunk))
+        yield from accept(parser.finish())
+    except Exception as e:
+        if is_auth_error(e):
+            invalidate_llm(llm)
+        failure = f"一次生成失败，剩余部分使用模拟数据：{str(e)}"
+
+    if failure:
+        results = generate_xhs_note_concurrently(None, scene, topic, style, parts=remaining)
+        notes = dict.fromkeys(remaining, failure)
+    else:
+        results = generate_xhs_note_concurrently(llm, scene, topic, style, parts=remaining)
+        notes = {part: repair_notes.get(part, f"{SECTION_LABELS[part]}缺失，单独重新生成") for part in remaining}
+    for part, result, warnings in results:
+        yield part, result, [notes[part], *warnings]
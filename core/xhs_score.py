@@ -0,0 +1,105 @@
+"""
+小红书文案候选的本地打分（best-of-N 排序用），不依赖 Streamlit、不调用模型
+所有候选拼成一个码点数组，用 numpy 一次性算出逐行/逐篇统计，候选数和文案长度增加时开销近似线性。
+规则与 core.xhs_copy 的系统提示词一致，每条规则 0~1 分，按权重加总为 0~100 分：
+- titles：开头 5 行标题，每个不超过 20 字
+- emoji：emoji 密度落在合适区间（太少没氛围，太多显得堆砌）
+- tags：正好 5 个 # 标签
+- paragraphs：正文分段清晰，每段不超过约 2 行
+- length：正文字数接近所选长度
+"""
+import numpy as np
+
+TITLE_COUNT = 5
+MAX_TITLE_CHARS = 20
+TAG_COUNT = 5
+MAX_PARAGRAPH_CHARS = 60  # 手机上约 2 行
+EMOJI_DENSITY = (1 / 40, 1 / 12)  # 每个可见字符的 emoji 数的合适区间
+LENGTH_TARGETS = {"短（100字内）": 100, "中（200字）": 200, "长（300字）": 300}
+WEIGHTS = {"titles": 0.25, "emoji": 0.15, "tags": 0.2, "paragraphs": 0.2, "length": 0.2}
+
+EMOJI_RANGES = ((0x1F000, 0x1FAFF), (0x2600, 0x27BF), (0x2B00, 0x2BFF))
+_SEPARATOR = 0  # 候选之间的分隔码点（文案中不会出现 NUL）
+_NEWLINE = ord("\n")
+_SPACES = np.array([ord(" "), ord("\t"), ord("\r"), 0x3000, 0xFE0F, 0x200D], dtype=np.uint32)  # 含 emoji 变体/连接符
+_HASHES = np.array([ord("#"), ord("＃")], dtype=np.uint32)
+
+
+def _per_group(groups, mask, size):
+    """按组计数（mask 为 True 的元素）"""
+    return np.bincount(groups[mask], minlength=size)
+
+
+def score_candidates(texts, length=None):
+    """
+    给一组候选打分
+    :return: (总分数组（0~100）, {规则名: 0~1 分数组})，顺序与 texts 一致
+    """
+    count = len(texts)
+    if not count:
+        return np.zeros(0), {name: np.zeros(0) for name in WEIGHTS}
+    joined = "\0".join(texts) + "\0"
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+
+    separator = codes == _SEPARATOR
+    breaks = separator | (codes == _NEWLINE)
+    candidate = np.cumsum(separator) - separator  # 每个码点所属候选（分隔符归前一篇）
+    line = np.cumsum(breaks) - breaks  # 每个码点所属行（全局编号）
+    lines = int(line[-1]) + 1
+    visible = ~breaks & ~np.isin(codes, _SPACES)
+    emoji = np.zeros(codes.shape, dtype=bool)
+    for low, high in EMOJI_RANGES:
+        emoji |= (codes >= low) & (codes <= high)
+
+    # 逐行统计
+    line_candidate = np.zeros(lines, dtype=np.int64)
+    line_candidate[line] = candidate
+    line_chars = _per_group(line, visible, lines)
+    line_tags = _per_group(line, np.isin(codes, _HASHES), lines)
+    nonempty = line_chars > 0
+    # 每行是本篇第几个非空行（从 1 开始）
+    ranks = np.cumsum(nonempty)
+    starts = np.searchsorted(line_candidate, np.arange(count))
+    ranks = ranks - np.concatenate(([0], ranks))[starts][line_candidate]
+    tag_line = line_tags > 0
+    title = nonempty & ~tag_line & (ranks <= TITLE_COUNT)
+    body = nonempty & ~tag_line & ~title
+
+    def per_candidate(mask, weights=None):
+        return np.bincount(line_candidate[mask], weights=None if weights is None else weights[mask], minlength=count)
+
+    scores = {}
+    scores["titles"] = per_candidate(title & (line_chars <= MAX_TITLE_CHARS)) / TITLE_COUNT
+
+    chars = _per_group(candidate, visible, count)
+    density = _per_group(candidate, emoji, count) / np.maximum(chars, 1)
+    low, high = EMOJI_DENSITY
+    scores["emoji"] = np.where(density < low, density / low, np.clip(1 - (density - high) / high, 0, 1))
+
+    tags = _per_group(candidate, np.isin(codes, _HASHES), count)
+    scores["tags"] = np.clip(1 - np.abs(tags - TAG_COUNT) / TAG_COUNT, 0, 1)
+
+    paragraphs = per_candidate(body)
+    short_paragraphs = per_candidate(body & (line_chars <= MAX_PARAGRAPH_CHARS))
+    scores["paragraphs"] = short_paragraphs / np.maximum(paragraphs, 1)
+
+    target = LENGTH_TARGETS.get(length)
+    body_chars = per_candidate(body, line_chars.astype(float))
+    scores["length"] = np.clip(1 - np.abs(body_chars - target) / target, 0, 1) if target else np.ones(count)
+
+    total = sum(WEIGHTS[name] * values for name, values in scores.items()) * 100
+    return total, scores
+
+
+def rank_candidates(texts, length=None):
+    """按分数从高到低排序，返回 [{"content", "score", "scores"}]（同分保持原顺序）"""
+    total, scores = score_candidates(texts, length)
+    order = np.argsort(-total, kind="stable")
+    return [
+        {
+            "content": texts[i],
+            "score": round(float(total[i]), 1),
+            "scores": {name: round(float(values[i]), 2) for name, values in scores.items()},
+        }
+        for i in order
+    ]
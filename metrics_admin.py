@@ -0,0 +1,134 @@
+import streamlit as st
+import time
+from datetime import datetime
+# 各页面进程把指标快照写到 .cache/metrics，这里只读取和汇总
+from core.metrics import (
+    histogram_quantile,
+    load_snapshots,
+    merge_snapshots,
+    remove_stale_snapshots,
+    render_prometheus
+)
+
+# -------------------------- 页面基础配置 --------------------------
+st.set_page_config(
+    page_title="运行指标 - 管理页",
+    page_icon="📈",
+    layout="wide"
+)
+
+# -------------------------- 侧边栏：筛选 --------------------------
+st.sidebar.header("📈 指标筛选")
+max_age_hours = st.sidebar.number_input("只看最近更新的进程（小时，0 表示全部）", min_value=0, value=24, step=1)
+records = load_snapshots(max_age=max_age_hours * 3600 if max_age_hours else None)
+apps = sorted({record["app"] for record in records})
+selected_apps = st.sidebar.multiselect("应用", apps, default=apps)
+records = [record for record in records if record["app"] in selected_apps]
+
+if st.sidebar.button("🧹 清理 24 小时未更新的快照"):
+    removed = remove_stale_snapshots()
+    st.sidebar.success(f"已清理 {len(removed)} 个进程的快照")
+    st.rerun()
+if st.sidebar.button("🔄 刷新"):
+    st.rerun()
+
+# -------------------------- 主界面 --------------------------
+st.title("📈 运行指标")
+st.caption("各页面进程每 10 秒写一次快照；延迟分位数由直方图估算（与 PromQL histogram_quantile 口径一致）")
+
+if not records:
+    st.info("暂无指标数据：启动任一页面并产生调用后，约 10 秒内会出现在这里")
+    st.stop()
+
+st.markdown("#### 进程")
+st.table([{
+    "实例": record["instance"],
+    "最后更新": datetime.fromtimestamp(record["updated_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+    "距今(秒)": int(time.time() - record["updated_at"]),
+} for record in records])
+
+merged = merge_snapshots(records)
+buckets = merged["buckets"]
+
+# 上游调用：次数、错误/超时、延迟分位数、兜底率
+st.markdown("#### 上游调用")
+rows = []
+for op in sorted(set(merged["latency"]) | set(merged["fallbacks"])):
+    histogram = merged["latency"].get(op)
+    calls = {outcome: n for (name, outcome), n in merged["calls"].items() if name == op}
+    total = sum(calls.values())
+    fallbacks = merged["fallbacks"].get(op, 0)
+
+    def quantile_ms(q):
+        value = histogram_quantile(buckets, histogram["counts"], q) if histogram else None
+        return round(value * 1000) if value is not None else None
+
+    rows.append({
+        "op": op,
+        "调用": total,
+        "错误": calls.get("error", 0),
+        "超时": calls.get("timeout", 0),
+        # 对冲落败被关闭的请求（cancelled）不算错误
+        "错误率": f"{(total - calls.get('ok', 0) - calls.get('cancelled', 0)) / total:.1%}" if total else "-",
+        "平均(ms)": round(histogram["sum"] / histogram["count"] * 1000) if histogram and histogram["count"] else None,
+        "P50(ms)": quantile_ms(0.5),
+        "P95(ms)": quantile_ms(0.95),
+        "P99(ms)": quantile_ms(0.99),
+        "模板兜底": fallbacks,
+        # 未填密钥时不发请求直接兜底，调用数为 0，兜底率无意义
+        "兜底率": f"{fallbacks / total:.1%}" if total else "-",
+    })
+st.dataframe(rows, use_container_width=True, hide_index=True)
+
+# 对冲请求：发出次数、胜出率、因预算跳过的次数（流式调用的 op 带 :first_chunk 后缀）
+hedge_ops = sorted({op for op, _ in merged["hedges"]})
+if hedge_ops:
+    st.markdown("#### 对冲请求")
+    hedge_rows = []
+    for op in hedge_ops:
+        events = {event: n for (name, event), n in merged["hedges"].items() if name == op}
+        decided = events.get("won", 0) + events.get("lost", 0)
+        hedge_rows.append({
+            "op": op,
+            "发出对冲": events.get("launched", 0),
+            "对冲胜出": events.get("won", 0),
+            "原请求胜出": events.get("lost", 0),
+            "胜出率": f"{events.get('won', 0) / decided:.0%}" if decided else "-",
+            "超预算未对冲": events.get("over_budget", 0),
+        })
+    st.dataframe(hedge_rows, use_container_width=True, hide_index=True)
+
+# 模型选择：各 op 按上下文需求落到哪个模型
+route_ops = sorted({op for op, _ in merged["routes"]})
+if route_ops:
+    st.markdown("#### 模型选择")
+    route_models = sorted({model for _, model in merged["routes"]})
+    st.dataframe([
+        {"op": op, **{model: merged["routes"].get((op, model), 0) for model in route_models}}
+        for op in route_ops
+    ], use_container_width=True, hide_index=True)
+
+# token 用量
+st.markdown("#### Token 用量")
+token_ops = sorted({op for op, _ in merged["tokens"]})
+if token_ops:
+    st.dataframe([{
+        "op": op,
+        "prompt": merged["tokens"].get((op, "prompt"), 0),
+        "completion": merged["tokens"].get((op, "completion"), 0),
+    } for op in token_ops], use_container_width=True, hide_index=True)
+else:
+    st.caption("暂无 token 用量（流式调用时上游可能不返回 usage）")
+
+# Prometheus 导出
+st.markdown("#### Prometheus")
+prometheus_text = render_prometheus(records)
+st.download_button(
+    "💾 下载 Prometheus 文本",
+    data=prometheus_text,
+    file_name="metrics.prom",
+    mime="text/plain",
+    key="download_prometheus"
+)
+with st.expander("查看原始文本"):
+    st.code(prometheus_text, language="text")
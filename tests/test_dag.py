@@ -0,0 +1,26 @@
+import pytest
+
+from core.dag import run_stage_dag
+
+
+def stage(*deps):
+    return (lambda results, warn: sorted(results), list(deps))
+
+
+def test_stages_run_after_their_dependencies():
+    stages = {"选题": stage(), "综述": stage("选题"), "摘要": stage("选题", "综述")}
+    results = {name: result for name, result, _ in run_stage_dag(stages)}
+    assert results == {"选题": [], "综述": ["选题"], "摘要": ["综述", "选题"]}
+
+
+def test_cycle_is_rejected_before_running():
+    stages = {"选题": stage(), "综述": stage("摘要"), "摘要": stage("综述"), "导出": stage("摘要")}
+    with pytest.raises(ValueError) as error:
+        run_stage_dag(stages)
+    assert "综述" in str(error.value) and "摘要" in str(error.value) and "导出" in str(error.value)
+    assert "选题" not in str(error.value)
+
+
+def test_misspelled_dependency_is_rejected():
+    with pytest.raises(ValueError, match="综术"):
+        run_stage_dag({"综述": stage(), "摘要": stage("综术")})
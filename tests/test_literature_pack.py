@@ -0,0 +1,35 @@
+import pytest
+
+from core.literature_pack import LiteraturePack, build_pack
+from core.literature_store import LiteratureStore
+from core.scholar import builtin_literature
+
+QUERIES = [
+    ("计算机科学/机器学习/大模型幻觉", "低资源场景性能下降"),
+    ("机器学习/小样本", ""),
+    ("", "hallucination"),
+    ("材料科学/高分子", ""),
+    ("计算机科学/数据库", ""),
+]
+
+
+@pytest.fixture
+def pack(tmp_path):
+    path = str(tmp_path / "literature.pack")
+    build_pack(list(builtin_literature()) * 2, path)
+    return LiteraturePack(path)
+
+
+def test_duplicates_are_dropped(pack):
+    assert pack.count() == len(list(builtin_literature()))
+
+
+@pytest.mark.parametrize("field, core_problem", QUERIES)
+def test_pack_matches_store(pack, field, core_problem):
+    store = LiteratureStore(":memory:")
+    store.add_many(builtin_literature())
+    assert pack.search(field, core_problem) == store.search(field, core_problem)
+
+
+def test_shared_bigram_is_not_a_match(pack):
+    assert pack.search("材料科学/高分子") == []
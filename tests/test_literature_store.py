@@ -0,0 +1,24 @@
+import pytest
+
+from core.literature_store import LiteratureStore
+from core.scholar import CORE_LITERATURE, builtin_literature, get_literature
+
+
+@pytest.fixture
+def store():
+    store = LiteratureStore(":memory:")
+    store.add_many(builtin_literature())
+    return store
+
+
+def test_matching_field_returns_its_papers(store):
+    papers = store.search("计算机科学/机器学习/大模型幻觉", "低资源场景性能下降")
+    assert len(papers) == 3
+    assert all(paper["field"] == "计算机科学/机器学习/大模型幻觉抑制" for paper in papers)
+
+
+@pytest.mark.parametrize("field", ["材料科学/高分子", "计算机科学/数据库"])
+def test_shared_bigram_is_not_a_match(store, field):
+    """只和内置领域共有「科学」「计算机科学」这类字对，不应命中"""
+    assert store.search(field) == []
+    assert get_literature(field, store=store) == CORE_LITERATURE["默认"]
@@ -0,0 +1,16 @@
+from core.xhs_note import note_space, unique_notes
+
+TOPICS = ["防晒", "通勤穿搭", "防晒"]
+
+
+def test_unique_notes_cover_space_without_duplicates():
+    """unique_notes 不再逐篇去重，靠的是每个取值轴都出现在标题或正文里"""
+    notes = list(unique_notes(TOPICS, limit=10 ** 9))
+    assert len(notes) == note_space(TOPICS).size
+    assert len({(note["content"], *note["titles"]) for note in notes}) == len(notes)
+
+
+def test_seeded_enumeration_is_reproducible():
+    first = [note["content"] for note in unique_notes(TOPICS, limit=50, seed=3)]
+    assert first == [note["content"] for note in unique_notes(TOPICS, limit=50, seed=3)]
+    assert len(first) == 50
@@ -0,0 +1,55 @@
+"""
+各 Streamlit 页面共用的界面组件
+- queue_notifier：限流排队时在占位区显示排队位置（见 core.rate_limit.set_admission_context）
+- render_debug_panel：地址栏加 ?debug=1 时在侧边栏显示启动性能
+"""
+import threading
+import time
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from core.chains import chain_registry
+from core.lazy import import_timings, importtime_breakdown
+
+# LangChain 延迟到首次验证/生成时才导入，首屏不承担这部分开销
+LAZY_MODULES = ["langchain_openai", "langchain_core.prompts", "langchain_core.output_parsers"]
+
+
+# -------------------------- 限流排队提示 --------------------------
+def queue_notifier(placeholder):
+    """排队回调：在占位区显示排队位置，放行后清除；生成在工作线程中进行，写页面前先挂上本次运行的上下文"""
+    ctx = get_script_run_ctx()
+
+    def on_wait(position, eta):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        if position is None:
+            placeholder.empty()
+        else:
+            placeholder.info(f"⏳ 调用高峰排队中：前面还有 {position} 个请求，预计等待约 {eta:.0f} 秒")
+    return on_wait
+
+
+# -------------------------- 调试：启动性能 --------------------------
+def render_debug_panel(page_start):
+    """
+    调试面板（地址栏加 ?debug=1 显示）：本次运行耗时、延迟导入耗时、-X importtime 明细
+    :param page_start: 页面脚本开头记下的 time.perf_counter()
+    """
+    if st.query_params.get("debug") != "1":
+        return
+    with st.sidebar.expander("🛠️ 启动性能（调试）", expanded=True):
+        st.caption(f"本次脚本运行耗时：{(time.perf_counter() - page_start) * 1000:.0f} ms")
+        chain_stats = chain_registry.stats()
+        st.caption(
+            f"调用链缓存：命中 {chain_stats['hits']} 次 ｜ 未命中 {chain_stats['misses']} 次 ｜ "
+            f"命中率 {chain_stats['hit_rate']:.0%} ｜ 客户端 {chain_stats['clients']} 个"
+        )
+        timings = import_timings()
+        if timings:
+            st.table([{"模块": name, "首次导入(ms)": round(seconds * 1000, 1)} for name, seconds in timings.items()])
+        else:
+            st.caption("尚未触发延迟导入（首次生成时才加载 LangChain）")
+        if st.button("📊 分析导入耗时（-X importtime）", key="importtime_breakdown"):
+            rows = importtime_breakdown(LAZY_MODULES)
+            st.table([{"模块": name, "自身(ms)": self_ms, "累计(ms)": total_ms} for name, self_ms, total_ms in rows])
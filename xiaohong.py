@@ -1,382 +1,624 @@
-# 先检查核心依赖是否安装，缺失则给出友好提示
-try:
-    import streamlit as st
-    from langchain_openai import ChatOpenAI
-    from langchain.prompts import ChatPromptTemplate
-    from langchain.schema.output_parser import StrOutputParser
-    import traceback
-    from datetime import datetime
-    import random
-    import string
-    import os
-    from dotenv import load_dotenv
-except ImportError as e:
-    # 友好提示依赖缺失
-    missing_pkg = str(e).split("'")[1]
-    print(f"""
-    ❌ 缺失必要依赖包：{missing_pkg}
-    请执行以下命令安装：
-    pip install streamlit langchain langchain-openai python-dotenv
-    """)
-    exit(1)
-
-# 加载环境变量（增强配置灵活性）
-load_dotenv()
-
-# ====================== 页面基础配置 ======================
-st.set_page_config(
-    page_title="小红书爆款文案AI创作助手",
-    page_icon="📕",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# ====================== 全局计数器初始化 ======================
-if 'download_btn_counter' not in st.session_state:
-    st.session_state.download_btn_counter = 0
-
-# ====================== 会话状态初始化 ======================
-def init_session_state():
-    """初始化所有会话状态变量"""
-    default_states = {
-        "chat_history": [],
-        "api_key": "",
-        "last_generated": "",
-        "generate_status": "idle"  # idle / generating / success / error
-    }
-    for key, value in default_states.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
-
-init_session_state()
-
-# ====================== 核心函数：LangChain 驱动的文案生成 ======================
-def generate_xiaohongshu_content(api_key, theme, style, length, category):
-    """
-    基于LangChain完整框架调用 Kimi API 生成小红书文案
-    :param api_key: Kimi API Key
-    :param theme: 创作主题
-    :param style: 文案风格
-    :param length: 文案长度
-    :param category: 内容品类
-    :return: (生成的文案内容, 错误信息)
-    """
-    # 长度对应 Token 配置
-    length_token_map = {
-        "短（100字内）": 300,
-        "中（200字）": 500,
-        "长（300字）": 800
-    }
-    max_tokens = length_token_map.get(length, 500)
-
-    try:
-        # 1. 初始化LangChain封装的Kimi聊天模型（严格遵循LangChain规范）
-        llm = ChatOpenAI(
-            model="moonshot-v1-8k",
-            api_key=api_key,
-            base_url="https://api.moonshot.cn/v1",
-            temperature=0.7,  # 创意性控制
-            max_tokens=max_tokens,
-            timeout=60,  # 超时时间
-            max_retries=2,  # 重试次数
-            streaming=False  # 关闭流式输出保持原有体验
-        )
-
-        # 2. 构建结构化提示模板（LangChain标准PromptTemplate）
-        system_prompt = """你是一名小红书爆款文案创作专家，精通各类风格和品类的内容创作，熟悉小红书平台的用户偏好和流行趋势。
-请严格按照以下规则生成文案：
-1. 标题：生成5个吸引人的标题，每个标题必须包含emoji，字数不超过20字，换行分隔；
-2. 正文：根据指定长度撰写，分段清晰（每段不超过2行），使用口语化表达，适当添加emoji增强情感；
-3. 流行语：自然融入小红书热门词汇（如"谁懂啊"、"绝绝子"、"亲测有效"、"YYDS"等）；
-4. 标签：结尾添加5个高度相关的话题标签，格式为#标签名，标签之间空格分隔；
-5. 输出格式：直接输出文案内容，无任何解释、说明或额外文字。"""
-
-        user_prompt = """创作主题：{theme}
-文案风格：{style}
-文案长度：{length}
-内容品类：{category}
-请按照上述要求创作一篇小红书爆款文案，语气亲切自然，像和朋友分享一样。"""
-
-        # 组合聊天提示模板（LangChain标准格式）
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", user_prompt)
-        ])
-
-        # 3. 构建完整的LangChain处理链（提示模板 → 模型 → 输出解析）
-        # 使用StrOutputParser确保输出格式统一，符合LangChain最佳实践
-        chain = prompt | llm | StrOutputParser()
-
-        # 4. 调用LangChain链（严格使用invoke方法）
-        response = chain.invoke({
-            "theme": theme,
-            "style": style,
-            "length": length,
-            "category": category
-        })
-
-        # 返回生成的文案内容
-        return response, None
-
-    except Exception as e:
-        # 详细错误信息（便于调试）
-        error_detail = f"""
-        错误类型：{type(e).__name__}
-        错误信息：{str(e)}
-        排查建议：
-        1. 检查API Key是否正确
-        2. 检查网络是否能访问https://api.moonshot.cn
-        3. 确认API Key有足够的调用额度
-        4. 完整错误栈：
-        {traceback.format_exc()}
-        """
-        return None, error_detail
-
-# ====================== 工具函数：文案操作 ======================
-def copy_to_clipboard(text):
-    """复制文本到剪贴板（修复f-string反斜杠问题）"""
-    # 先处理文本中的特殊字符，避免JavaScript语法错误
-    escaped_text = text.replace("`", "\\`").replace("\\", "\\\\")
-    # 使用字符串拼接替代f-string中的反斜杠
-    js_code = """
-    <script>
-    (async () => {
-        try {
-            await navigator.clipboard.writeText(`%s`);
-            alert('✅ 文案已复制到剪贴板！');
-        } catch (err) {
-            alert('❌ 复制失败，请手动复制！');
-            console.error('复制失败:', err);
-        }
-    })();
-    </script>
-    """ % escaped_text
-    # 输出JavaScript代码
-    st.write(js_code, unsafe_allow_html=True)
-    st.success("✅ 文案已复制到剪贴板！")
-
-def generate_unique_download_key(idx=None):
-    """生成绝对唯一的下载按钮key（多重保障）"""
-    # 1. 全局计数器
-    st.session_state.download_btn_counter += 1
-    # 2. 随机字符串
-    random_str = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-    # 3. 时间戳（毫秒级）
-    timestamp = str(datetime.now().timestamp()).replace('.', '')[-8:]
-    # 4. 索引（可选）
-    idx_str = f"_{idx}" if idx is not None else ""
-
-    # 组合所有唯一标识
-    unique_key = f"download_btn_{st.session_state.download_btn_counter}_{timestamp}_{random_str}{idx_str}"
-    return unique_key
-
-def download_content(text, theme, timestamp, idx=None):
-    """生成下载按钮（终极修复重复key问题）"""
-    # 生成绝对唯一的key
-    unique_key = generate_unique_download_key(idx)
-
-    # 处理文件名特殊字符
-    safe_theme = theme.replace("/", "-").replace("\\", "-").replace(":", "-").replace("*", "-").replace("?", "-")
-    safe_theme = safe_theme.replace('"', "-").replace("<", "-").replace(">", "-").replace("|", "-")
-    filename = f"小红书文案_{safe_theme}_{timestamp.replace(':', '-').replace(' ', '_')}.txt"
-
-    st.download_button(
-        label="💾 下载文案",
-        data=text,
-        file_name=filename,
-        mime="text/plain",
-        use_container_width=True,
-        key=unique_key  # 绝对唯一的key
-    )
-
-# ====================== 侧边栏配置 ======================
-with st.sidebar:
-    st.title("⚙️ 系统配置")
-    st.divider()
-
-    # API Key 输入
-    api_key = st.text_input(
-        "Kimi API Key",
-        type="password",
-        value=st.session_state.api_key,
-        placeholder="sk-xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
-        help="API Key 获取地址：https://platform.moonshot.cn/console/api-keys",
-        label_visibility="collapsed"
-    )
-
-    # 保存 API Key 到会话状态
-    if api_key and api_key != st.session_state.api_key:
-        st.session_state.api_key = api_key
-        st.success("✅ API Key 已保存！")
-
-    st.divider()
-
-    # 历史记录管理
-    st.subheader("📜 历史管理")
-    if st.button("🗑️ 清空历史记录", use_container_width=True, type="secondary"):
-        st.session_state.chat_history = []
-        st.session_state.last_generated = ""
-        st.session_state.download_btn_counter = 0  # 重置计数器
-        st.success("✅ 历史记录已清空！")
-        st.rerun()
-
-    st.divider()
-
-    # 使用说明
-    st.subheader("💡 使用指南")
-    st.markdown("""
-    ### 操作步骤：
-    1. 输入 Kimi API Key（必填）
-    2. 填写创作主题（必填）
-    3. 选择风格/长度/品类
-    4. 点击「生成爆款文案」
-    5. 复制/下载生成的文案
-
-    ### 注意事项：
-    - API Key 需自行从月之暗面平台获取
-    - 创作主题越具体，生成效果越好
-    - 生成的文案可直接复制到小红书发布
-    """)
-
-    st.divider()
-    st.caption("© 2025 小红书文案助手\nPowered by Kimi AI & LangChain")
-
-# ====================== 主界面 ======================
-st.title("📕 小红书爆款文案AI创作助手")
-st.markdown("### 基于 LangChain + Kimi AI 一键生成高互动文案")
-st.divider()
-
-# 检查 API Key 是否配置
-if not st.session_state.api_key:
-    st.warning("⚠️ 请先在左侧侧边栏输入 Kimi API Key 后再使用！")
-    st.info("🔑 API Key 是调用 Kimi AI 的凭证，可从 [月之暗面平台](https://platform.moonshot.cn) 获取")
-    st.stop()
-
-# 创作参数配置区
-st.subheader("🎯 创作参数配置")
-col1, col2, col3, col4 = st.columns(4, gap="medium")
-
-with col1:
-    theme = st.text_input(
-        label="创作主题",
-        placeholder="例如：夏日防晒技巧、职场摸鱼神器",
-        help="输入核心创作主题，越具体越好",
-        value="",
-        max_chars=50
-    )
-
-with col2:
-    style = st.selectbox(
-        label="文案风格",
-        options=["种草", "干货", "测评", "情感", "搞笑", "治愈", "教程", "探店"],
-        index=0,
-        help="选择文案的整体风格调性"
-    )
-
-with col3:
-    length = st.selectbox(
-        label="文案长度",
-        options=["短（100字内）", "中（200字）", "长（300字）"],
-        index=1,
-        help="控制文案的字数和详细程度"
-    )
-
-with col4:
-    category = st.selectbox(
-        label="内容品类",
-        options=["美妆", "美食", "职场", "旅行", "数码", "教育", "健康", "穿搭", "家居", "其他"],
-        index=0,
-        help="选择内容所属的品类"
-    )
-
-st.divider()
-
-# 生成按钮及结果展示
-col_generate, col_empty = st.columns([1, 9])
-with col_generate:
-    generate_btn = st.button(
-        "🚀 生成爆款文案",
-        type="primary",
-        use_container_width=True,
-        disabled=not theme  # 主题为空时禁用按钮
-    )
-
-# 生成逻辑处理
-if generate_btn:
-    st.session_state.generate_status = "generating"
-    with st.spinner("🤖 AI 正在创作爆款文案中...请稍候"):
-        # 调用生成函数
-        content, error = generate_xiaohongshu_content(
-            st.session_state.api_key,
-            theme,
-            style,
-            length,
-            category
-        )
-
-        if content:
-            st.session_state.generate_status = "success"
-            st.session_state.last_generated = content
-
-            # 保存到历史记录
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            st.session_state.chat_history.append({
-                "time": timestamp,
-                "theme": theme,
-                "style": style,
-                "category": category,
-                "content": content
-            })
-
-            # 展示生成结果
-            st.subheader("✨ 生成结果")
-            st.markdown("---")
-            st.markdown(content)
-            st.markdown("---")
-
-            # 操作按钮
-            col_copy, col_download = st.columns(2, gap="small")
-            with col_copy:
-                if st.button("📋 复制文案", use_container_width=True, key="copy_current"):
-                    copy_to_clipboard(content)
-            with col_download:
-                download_content(content, theme, timestamp, idx="current")
-
-        else:
-            st.session_state.generate_status = "error"
-            st.error("❌ 文案生成失败！")
-            with st.expander("🔍 查看错误详情", expanded=True):
-                st.error(error)
-
-# 历史记录展示区
-st.divider()
-if st.session_state.chat_history:
-    st.subheader("📚 创作历史记录")
-    st.markdown(f"共生成 {len(st.session_state.chat_history)} 篇文案")
-    st.divider()
-
-    # 倒序展示历史记录
-    for idx, record in enumerate(reversed(st.session_state.chat_history)):
-        with st.expander(
-                label=f"📅 {record['time']} | 主题：{record['theme']} | 风格：{record['style']}",
-                expanded=False
-        ):
-            col_info, col_ops = st.columns([3, 1])
-            with col_info:
-                st.markdown(f"**品类：** {record['category']}")
-                st.markdown("---")
-                st.markdown(record['content'])
-            with col_ops:
-                st.button(
-                    "📋 复制",
-                    key=f"copy_history_{idx}",
-                    use_container_width=True,
-                    on_click=copy_to_clipboard,
-                    args=(record['content'],)
-                )
-                # 传递索引确保key唯一
-                download_content(record['content'], record['theme'], record['time'], idx=idx)
-        st.divider()
-else:
-    if st.session_state.generate_status == "idle":
-        st.info("📝 暂无创作历史，填写参数后点击「生成爆款文案」开始创作吧！")
+import time
+PAGE_START = time.perf_counter()  # 调试面板用：统计本次脚本运行（首屏）耗时
+
+# 先检查核心依赖是否安装，缺失则给出友好提示
+# LangChain 延迟到首次生成时才导入，这里只检查是否已安装
+try:
+    import streamlit as st
+    import importlib.util
+    import inspect
+    import math
+    from collections import OrderedDict
+    from datetime import datetime
+    import os
+    from dotenv import load_dotenv
+    from core.xhs_copy import (
+        MODEL_NAME,
+        TEMPERATURE,
+        generate_xiaohongshu_candidates,
+        generate_xiaohongshu_content,
+        stream_xiaohongshu_content
+    )
+    from core.response_cache import ResponseCache, make_cache_key
+    from core.similar_index import SimilarIndex
+    from core.history_store import HistoryStore
+    from core.history_export import EXPORT_FORMATS, export_to_tempfile, safe_filename
+    from core.moonshot import hash_api_key
+    from core.circuit_breaker import describe_breaker, moonshot_breaker
+    from core.metrics import start_metrics_export
+    from core.rate_limit import set_admission_context
+    from core.singleflight import single_flight
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from ui_common import queue_notifier, render_debug_panel
+    for pkg in ("langchain_openai", "langchain_core"):
+        if importlib.util.find_spec(pkg) is None:
+            raise ImportError(f"No module named '{pkg}'")
+except ImportError as e:
+    # 友好提示依赖缺失
+    missing_pkg = str(e).split("'")[1]
+    print(f"""
+    ❌ 缺失必要依赖包：{missing_pkg}
+    请执行以下命令安装：
+    pip install streamlit langchain langchain-openai python-dotenv
+    """)
+    exit(1)
+
+# 加载环境变量（增强配置灵活性）
+load_dotenv()
+start_metrics_export("xiaohong")  # 运行指标定期写入 .cache/metrics，供 metrics_admin.py 汇总
+
+# ====================== 页面基础配置 ======================
+st.set_page_config(
+    page_title="小红书爆款文案AI创作助手",
+    page_icon="📕",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# ====================== 会话状态初始化 ======================
+def init_session_state():
+    """初始化所有会话状态变量"""
+    default_states = {
+        "api_key": "",
+        "history_page": 1,
+        "history_query": "",
+        "history_bodies": OrderedDict(),  # 已展开记录的正文（有上限的 LRU）
+        "history_export": None,  # 最近一次生成的批量导出文件信息
+        "similar_offer": None,  # 找到相似主题的旧文案时，等待用户选择复用还是重新生成
+        "last_generated": "",
+        "generate_status": "idle"  # idle / generating / success / error
+    }
+    for key, value in default_states.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+init_session_state()
+
+# ====================== 响应缓存（跨会话、跨重启共享） ======================
+@st.cache_resource
+def get_response_cache():
+    """进程内共享同一个缓存连接，数据落盘在 .cache/responses.sqlite3"""
+    return ResponseCache()
+
+
+def xiaohongshu_cache_key(theme, style, length, category):
+    """相同（主题、风格、长度、品类）+ 模型 + 温度 命中同一条缓存"""
+    return make_cache_key(
+        MODEL_NAME,
+        TEMPERATURE,
+        theme=theme,
+        style=style,
+        length=length,
+        category=category
+    )
+
+
+@st.cache_resource
+def get_similar_index():
+    """相似主题索引，数据落盘在 .cache/similar.sqlite3"""
+    return SimilarIndex()
+
+
+def similar_namespace(style, length, category):
+    """只在风格、长度、品类都相同的旧文案里找相似主题"""
+    return f"xhs_copy|{style}|{length}|{category}"
+
+
+# 候选打分各规则在结果页的显示名（见 core.xhs_score）
+CANDIDATE_RULES = {"titles": "标题", "emoji": "emoji", "tags": "标签", "paragraphs": "分段", "length": "字数"}
+
+# ====================== 创作历史（SQLite 分页 + 按需加载正文） ======================
+HISTORY_PAGE_SIZE = 10
+HISTORY_BODY_CACHE_SIZE = 20  # 每个会话在内存中最多保留的正文条数
+# 新版 Streamlit 的 expander 可感知展开状态，折叠时不执行其中内容
+LAZY_EXPANDER = "on_change" in inspect.signature(st.expander).parameters
+
+
+@st.cache_resource
+def get_history_store():
+    """进程内共享同一个历史库连接，数据落盘在 .cache/history.sqlite3"""
+    return HistoryStore()
+
+
+def history_owner():
+    """历史记录归属：API Key 哈希（不落盘明文），同一密钥跨会话/重启可见"""
+    return hash_api_key(st.session_state.api_key)[:32]
+
+
+def reset_history_view():
+    """搜索条件变化或清空历史后回到第一页，并释放已加载的正文"""
+    st.session_state.history_page = 1
+    st.session_state.history_bodies = OrderedDict()
+
+
+def load_history_content(note_id):
+    """读取记录正文：先查会话内 LRU，未命中再按 id 查库"""
+    bodies = st.session_state.history_bodies
+    if note_id in bodies:
+        bodies.move_to_end(note_id)
+        return bodies[note_id]
+    content = get_history_store().get_content(history_owner(), note_id)
+    if content is not None:
+        bodies[note_id] = content
+        while len(bodies) > HISTORY_BODY_CACHE_SIZE:
+            bodies.popitem(last=False)
+    return content
+
+
+def render_history_body(record):
+    """展开后才执行：加载正文并渲染复制/下载按钮"""
+    content = load_history_content(record["id"])
+    if content is None:
+        st.warning("⚠️ 该记录已被删除")
+        return
+    col_info, col_ops = st.columns([3, 1])
+    with col_info:
+        st.markdown(f"**品类：** {record['category']}")
+        st.markdown("---")
+        st.markdown(content)
+    with col_ops:
+        st.button(
+            "📋 复制",
+            key=f"copy_history_{record['id']}",
+            use_container_width=True,
+            on_click=copy_to_clipboard,
+            args=(content,)
+        )
+        download_content(content, record['theme'], record['time'], key=f"download_history_{record['id']}")
+
+
+def discard_history_export():
+    """删除上一次的导出临时文件（下载完成或重新导出时调用）"""
+    export = st.session_state.history_export
+    st.session_state.history_export = None
+    if export and os.path.exists(export["path"]):
+        os.remove(export["path"])
+
+
+def build_history_export(fmt, query):
+    """按当前搜索条件流式导出到临时文件，只记录路径，不把文件内容放进会话状态"""
+    discard_history_export()
+    path, count = export_to_tempfile(get_history_store().iter_records(history_owner(), query), fmt)
+    suffix = f"_{safe_filename(query)}" if query else ""
+    st.session_state.history_export = {
+        "path": path,
+        "count": count,
+        "file_name": f"小红书文案历史{suffix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{EXPORT_FORMATS[fmt][1]}",
+        "mime": EXPORT_FORMATS[fmt][2],
+    }
+
+
+def render_history_export(query):
+    label = "📦 批量导出" + ("（当前搜索结果）" if query else "（全部历史）")
+    # 下载按钮每次渲染都会把整个导出文件读进内存，收起时不渲染
+    if LAZY_EXPANDER:
+        expander = st.expander(label, key="history_export_panel", on_change="rerun")
+        with expander:
+            if expander.open:
+                render_history_export_body(query)
+    else:
+        with st.expander(label):
+            if st.toggle("📦 显示导出选项", key="history_export_open"):
+                render_history_export_body(query)
+
+
+def render_history_export_body(query):
+    col_format, col_build = st.columns([3, 1])
+    with col_format:
+        fmt = st.selectbox(
+            "导出格式",
+            options=list(EXPORT_FORMATS),
+            format_func=lambda key: EXPORT_FORMATS[key][0],
+            key="history_export_format"
+        )
+    with col_build:
+        st.button(
+            "生成导出文件",
+            key="build_history_export",
+            use_container_width=True,
+            on_click=build_history_export,
+            args=(fmt, query)
+        )
+    export = st.session_state.history_export
+    if export and os.path.exists(export["path"]):
+        st.caption(f"已导出 {export['count']} 篇文案")
+        with open(export["path"], "rb") as f:
+            st.download_button(
+                label="💾 下载导出文件",
+                data=f,
+                file_name=export["file_name"],
+                mime=export["mime"],
+                key="download_history_export",
+                on_click=discard_history_export  # 下载后即删除临时文件
+            )
+
+
+def render_history_record(record):
+    label = f"📅 {record['time']} | 主题：{record['theme']} | 风格：{record['style']}"
+    if LAZY_EXPANDER:
+        expander = st.expander(label, key=f"history_{record['id']}", on_change="rerun")
+        with expander:
+            if expander.open:
+                render_history_body(record)
+    else:
+        # 旧版 Streamlit 无法得知展开状态，用开关显式加载正文
+        with st.expander(label):
+            if st.toggle("📖 加载正文", key=f"history_load_{record['id']}"):
+                render_history_body(record)
+
+
+# ====================== 工具函数：文案操作 ======================
+def copy_to_clipboard(text):
+    """复制文本到剪贴板（修复f-string反斜杠问题）"""
+    # 先处理文本中的特殊字符，避免JavaScript语法错误
+    escaped_text = text.replace("`", "\\`").replace("\\", "\\\\")
+    # 使用字符串拼接替代f-string中的反斜杠
+    js_code = """
+    <script>
+    (async () => {
+        try {
+            await navigator.clipboard.writeText(`%s`);
+            alert('✅ 文案已复制到剪贴板！');
+        } catch (err) {
+            alert('❌ 复制失败，请手动复制！');
+            console.error('复制失败:', err);
+        }
+    })();
+    </script>
+    """ % escaped_text
+    # 输出JavaScript代码
+    st.write(js_code, unsafe_allow_html=True)
+    st.success("✅ 文案已复制到剪贴板！")
+
+def download_content(text, theme, timestamp, key):
+    """生成下载按钮；key 由调用方按记录给出，保持稳定以便 Streamlit 跨重跑复用控件"""
+    filename = f"小红书文案_{safe_filename(theme)}_{timestamp.replace(':', '-').replace(' ', '_')}.txt"
+    st.download_button(
+        label="💾 下载文案",
+        data=text,
+        file_name=filename,
+        mime="text/plain",
+        use_container_width=True,
+        key=key
+    )
+
+# ====================== 侧边栏配置 ======================
+with st.sidebar:
+    st.title("⚙️ 系统配置")
+    st.divider()
+
+    # API Key 输入
+    api_key = st.text_input(
+        "Kimi API Key",
+        type="password",
+        value=st.session_state.api_key,
+        placeholder="sk-xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
+        help="API Key 获取地址：https://platform.moonshot.cn/console/api-keys",
+        label_visibility="collapsed"
+    )
+
+    # 保存 API Key 到会话状态
+    if api_key and api_key != st.session_state.api_key:
+        st.session_state.api_key = api_key
+        st.success("✅ API Key 已保存！")
+
+    st.divider()
+
+    # 上游健康状态（熔断时生成会立即失败，不再等待超时）
+    breaker_status = moonshot_breaker.status()
+    st.caption(describe_breaker(breaker_status))
+    if breaker_status["state"] != "closed" and breaker_status["last_error"]:
+        st.caption(f"最近错误：{breaker_status['last_error']}")
+
+    st.divider()
+
+    # 历史记录管理
+    st.subheader("📜 历史管理")
+    if st.button("🗑️ 清空历史记录", use_container_width=True, type="secondary",
+                 disabled=not st.session_state.api_key):
+        get_history_store().clear(history_owner())
+        reset_history_view()
+        discard_history_export()
+        st.session_state.last_generated = ""
+        st.success("✅ 历史记录已清空！")
+        st.rerun()
+
+    st.divider()
+
+    # 响应缓存管理
+    st.subheader("💾 响应缓存")
+    response_cache = get_response_cache()
+    cache_stats = response_cache.stats()
+    st.caption(
+        f"命中 {cache_stats['hits']} 次 ｜ 未命中 {cache_stats['misses']} 次 ｜ "
+        f"命中率 {cache_stats['hit_rate']:.0%} ｜ 已缓存 {cache_stats['entries']} 篇"
+    )
+    similar_stats = get_similar_index().stats()
+    st.caption(f"相似主题复用：索引 {similar_stats['entries']} 篇 ｜ 找到相似 {similar_stats['hits']} 次")
+    flight_stats = single_flight.stats()
+    st.caption(
+        f"相同请求合并：{flight_stats['coalesced']} 次 ｜ 实际调用 {flight_stats['leaders']} 次 ｜ "
+        f"进行中 {flight_stats['in_flight']} 个"
+    )
+    if st.button("🧹 清空响应缓存", use_container_width=True, type="secondary"):
+        response_cache.clear()
+        get_similar_index().clear()
+        st.success("✅ 响应缓存已清空！")
+        st.rerun()
+
+    st.divider()
+
+    # 使用说明
+    st.subheader("💡 使用指南")
+    st.markdown("""
+    ### 操作步骤：
+    1. 输入 Kimi API Key（必填）
+    2. 填写创作主题（必填）
+    3. 选择风格/长度/品类
+    4. 点击「生成爆款文案」
+    5. 复制/下载生成的文案
+
+    ### 注意事项：
+    - API Key 需自行从月之暗面平台获取
+    - 创作主题越具体，生成效果越好
+    - 生成的文案可直接复制到小红书发布
+    """)
+
+    st.divider()
+    st.caption("© 2025 小红书文案助手\nPowered by Kimi AI & LangChain")
+
+# ====================== 主界面 ======================
+st.title("📕 小红书爆款文案AI创作助手")
+st.markdown("### 基于 LangChain + Kimi AI 一键生成高互动文案")
+st.divider()
+
+# 检查 API Key 是否配置
+if not st.session_state.api_key:
+    st.warning("⚠️ 请先在左侧侧边栏输入 Kimi API Key 后再使用！")
+    st.info("🔑 API Key 是调用 Kimi AI 的凭证，可从 [月之暗面平台](https://platform.moonshot.cn) 获取")
+    render_debug_panel(PAGE_START)
+    st.stop()
+
+# 创作参数配置区
+st.subheader("🎯 创作参数配置")
+col1, col2, col3, col4 = st.columns(4, gap="medium")
+
+with col1:
+    theme = st.text_input(
+        label="创作主题",
+        placeholder="例如：夏日防晒技巧、职场摸鱼神器",
+        help="输入核心创作主题，越具体越好",
+        value="",
+        max_chars=50
+    )
+
+with col2:
+    style = st.selectbox(
+        label="文案风格",
+        options=["种草", "干货", "测评", "情感", "搞笑", "治愈", "教程", "探店"],
+        index=0,
+        help="选择文案的整体风格调性"
+    )
+
+with col3:
+    length = st.selectbox(
+        label="文案长度",
+        options=["短（100字内）", "中（200字）", "长（300字）"],
+        index=1,
+        help="控制文案的字数和详细程度"
+    )
+
+with col4:
+    category = st.selectbox(
+        label="内容品类",
+        options=["美妆", "美食", "职场", "旅行", "数码", "教育", "健康", "穿搭", "家居", "其他"],
+        index=0,
+        help="选择内容所属的品类"
+    )
+
+st.divider()
+
+# 生成按钮及结果展示
+col_generate, col_stream, col_bypass, col_candidates, col_empty = st.columns([1, 1, 1, 1, 6])
+with col_generate:
+    generate_btn = st.button(
+        "🚀 生成爆款文案",
+        type="primary",
+        use_container_width=True,
+        disabled=not theme  # 主题为空时禁用按钮
+    )
+with col_stream:
+    stream_mode = st.toggle(
+        "⚡ 流式输出",
+        value=True,
+        help="边生成边显示，无需等待整篇文案完成"
+    )
+with col_bypass:
+    bypass_cache = st.checkbox(
+        "🔄 跳过缓存重新生成",
+        value=False,
+        help="相同参数默认直接返回已缓存的文案，且与其他人同时提交的相同请求共享一次生成；"
+             "勾选后强制单独调用AI重新创作，并用新结果更新缓存"
+    )
+with col_candidates:
+    candidate_count = st.selectbox(
+        "🎲 候选篇数",
+        options=[1, 2, 3, 4, 5],
+        index=0,
+        help="大于 1 时一次生成多篇候选，按标题长度、emoji 密度、标签数、分段和字数在本地打分，"
+             "最高分排在最前，其余候选点标签页即可查看（不走缓存，也不支持流式输出）"
+    )
+
+# 相似主题复用：精确缓存未命中、但有相似主题的旧文案时，先让用户选择是否复用
+reuse_similar = regenerate = False
+offer = st.session_state.similar_offer
+if offer and offer["params"] != [theme, style, length, category]:
+    offer = st.session_state.similar_offer = None  # 参数已改，提议作废
+if offer:
+    offer_slot = st.empty()
+    with offer_slot.container():
+        st.info(
+            f"🔎 找到相似主题「{offer['text']}」的已有文案（相似度 {offer['similarity']:.0%}），"
+            "可直接复用，无需调用AI"
+        )
+        col_reuse, col_regenerate, _ = st.columns([1, 1, 5])
+        with col_reuse:
+            reuse_similar = st.button("♻️ 复用该文案", use_container_width=True, key="reuse_similar")
+        with col_regenerate:
+            regenerate = st.button("🚀 仍然重新生成", use_container_width=True, key="regenerate_similar")
+    if reuse_similar or regenerate:
+        offer_slot.empty()
+        st.session_state.similar_offer = None
+
+# 生成逻辑处理
+if generate_btn or reuse_similar or regenerate:
+    st.session_state.generate_status = "generating"
+    set_admission_context(get_script_run_ctx().session_id, queue_notifier(st.empty()))
+    cache_key = xiaohongshu_cache_key(theme, style, length, category)
+    candidates = []
+    cached_content = None if bypass_cache or candidate_count > 1 else response_cache.get(cache_key)
+    if reuse_similar:
+        cached_content = offer["content"]
+    elif not cached_content and not bypass_cache and not regenerate and candidate_count == 1:
+        match = get_similar_index().lookup(similar_namespace(style, length, category), theme)
+        if match:
+            st.session_state.similar_offer = {
+                "params": [theme, style, length, category],
+                "text": match["text"],
+                "similarity": match["similarity"],
+                "content": match["payload"]
+            }
+            st.session_state.generate_status = "idle"
+            st.rerun()
+    if cached_content:
+        # 命中缓存：直接返回，不调用AI
+        content, error = cached_content, None
+        stats = {"first_token_time": None, "total_time": 0.0}
+        st.subheader("✨ 生成结果")
+        st.markdown("---")
+        st.markdown(content)
+    elif candidate_count > 1:
+        with st.spinner(f"🤖 AI 正在创作 {candidate_count} 篇候选文案...请稍候"):
+            start = time.perf_counter()
+            candidates, error = generate_xiaohongshu_candidates(
+                st.session_state.api_key,
+                theme,
+                style,
+                length,
+                category,
+                n=candidate_count
+            )
+            content = candidates[0]["content"] if candidates else None
+            stats = {"first_token_time": None, "total_time": time.perf_counter() - start}
+    elif stream_mode:
+        # 流式输出：token到达即写入结果区
+        st.subheader("✨ 生成结果")
+        st.markdown("---")
+        stats = {}
+        st.write_stream(stream_xiaohongshu_content(
+            st.session_state.api_key,
+            theme,
+            style,
+            length,
+            category,
+            stats,
+            coalesce=not bypass_cache
+        ))
+        content, error = stats["content"], stats["error"]
+    else:
+        with st.spinner("🤖 AI 正在创作爆款文案中...请稍候"):
+            start = time.perf_counter()
+            # 调用生成函数
+            content, error = generate_xiaohongshu_content(
+                st.session_state.api_key,
+                theme,
+                style,
+                length,
+                category,
+                coalesce=not bypass_cache
+            )
+            stats = {"first_token_time": None, "total_time": time.perf_counter() - start}
+
+    if content:
+        st.session_state.generate_status = "success"
+        st.session_state.last_generated = content
+        if not cached_content:
+            response_cache.put(cache_key, content)
+            get_similar_index().add(similar_namespace(style, length, category), theme, content)
+
+        # 保存到历史记录
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        get_history_store().add(history_owner(), theme, style, length, category, content, created_at=timestamp)
+
+        # 展示生成结果（命中缓存/流式模式下已渲染）
+        if candidates:
+            st.subheader("✨ 生成结果")
+            st.markdown("---")
+            labels = [f"{'🥇 ' if i == 0 else ''}候选{i + 1}（{c['score']:.0f}分）" for i, c in enumerate(candidates)]
+            for tab, candidate in zip(st.tabs(labels), candidates):
+                with tab:
+                    st.markdown(candidate["content"])
+                    st.caption(" ｜ ".join(f"{CANDIDATE_RULES[name]} {value:.0%}"
+                                          for name, value in candidate["scores"].items()))
+        elif not cached_content and not stream_mode:
+            st.subheader("✨ 生成结果")
+            st.markdown("---")
+            st.markdown(content)
+        st.markdown("---")
+        if reuse_similar:
+            st.caption(f"♻️ 复用了相似主题「{offer['text']}」的文案，未调用AI；想要不同版本可勾选「跳过缓存重新生成」")
+        elif cached_content:
+            st.caption("💾 命中缓存，未调用AI；想要不同版本可勾选「跳过缓存重新生成」")
+        elif candidates:
+            st.caption(f"⏱️ {len(candidates)} 篇候选总耗时 {stats['total_time']:.2f}s ｜ "
+                       "已保存最高分的一篇，复制/下载也针对它")
+        elif stats["first_token_time"] is not None:
+            st.caption(f"⏱️ 首字耗时 {stats['first_token_time']:.2f}s ｜ 总耗时 {stats['total_time']:.2f}s")
+        else:
+            st.caption(f"⏱️ 总耗时 {stats['total_time']:.2f}s")
+
+        # 操作按钮
+        col_copy, col_download = st.columns(2, gap="small")
+        with col_copy:
+            if st.button("📋 复制文案", use_container_width=True, key="copy_current"):
+                copy_to_clipboard(content)
+        with col_download:
+            download_content(content, theme, timestamp, key="download_current")
+
+    else:
+        st.session_state.generate_status = "error"
+        st.error("❌ 文案生成失败！")
+        with st.expander("🔍 查看错误详情", expanded=True):
+            st.error(error)
+
+# 历史记录展示区（每次重跑只查询当前页的元数据）
+st.divider()
+history_store = get_history_store()
+owner = history_owner()
+if history_store.count(owner):
+    st.subheader("📚 创作历史记录")
+    col_search, col_page = st.columns([3, 1])
+    with col_search:
+        history_query = st.text_input(
+            "搜索历史",
+            key="history_query",
+            placeholder="输入主题/正文关键词，空格分隔多个关键词",
+            on_change=reset_history_view
+        )
+    total = history_store.count(owner, history_query)
+    total_pages = max(1, math.ceil(total / HISTORY_PAGE_SIZE))
+    st.session_state.history_page = min(st.session_state.history_page, total_pages)
+    with col_page:
+        page = st.number_input("页码", min_value=1, max_value=total_pages, step=1, key="history_page")
+    st.markdown(f"共 {total} 篇文案 ｜ 第 {page}/{total_pages} 页")
+    render_history_export(history_query)
+    st.divider()
+
+    for record in history_store.page(owner, page, HISTORY_PAGE_SIZE, history_query):
+        render_history_record(record)
+        st.divider()
+else:
+    if st.session_state.generate_status == "idle":
+        st.info("📝 暂无创作历史，填写参数后点击「生成爆款文案」开始创作吧！")
+
+render_debug_panel(PAGE_START)